@@ -0,0 +1,243 @@
+'''
+DESCRIPTION:
+
+Measures how fast the test harness in conftest.py is, so a change that slows it down
+shows up before students notice. It runs the same pipeline the tests do against the
+solution file (SOLUTION_FILE in tests/.env) and a few variations on it that are each
+hard on the harness in a different way:
+
+- solution: the solution as is.
+- tight_menu_loop: thousands of small function calls every time something is printed.
+- thousands_of_movies: creates, lists and deletes 3000 movies before the first choice.
+- deep_recursion: a helper recurses 600 deep, and every input is asked for 300 calls deep.
+- huge_prints: megabytes of output for every input test case.
+
+The solution isn't part of the template students get, so neither are the variations:
+each file in the student_variants folder only has the part that makes it hard on the
+harness (mostly by wrapping print() or input()), and is put in front of the solution's
+code to make that variant's student file when the benchmark runs.
+
+For each variant, every input test case in input_test_cases_final.json is run `rounds` times through
+load_student_code (with the session execution cache turned off, so every run really runs).
+The captured output is put through normalize_text and checked for the expected printed messages
+the way test_02 does it, and every expected message also goes through get_similarity_feedback
+as if it had been misspelled (the slowest path test_02 can take).
+At the end, pytest_sessionfinish writes the reports.
+
+Each variant runs in its own process (and in its own temporary directory), so peak memory
+can be reported per variant. Peak RSS is reported for that process and for the warm
+workers that ran the student's code. Worker RSS is only reported on Linux.
+
+Reported per variant: wall time, peak RSS, the latency of each stage per input test case
+(min, median, 90th percentile, max), and the phases (see PHASE TIMINGS in conftest.py)
+that took the most time.
+
+Run it from the root of the repository (with the solution file there):
+    python tests/benchmark_scripts/benchmark_harness.py
+'''
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import conftest  # noqa: E402
+
+json_file = r"tests/test_cases/input_test_cases_final.json"
+# Solution file the variants are made from:
+solution_file = f"{conftest.solution_module}.py"
+variants_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "student_variants")
+# Variants to benchmark: "solution" on its own, or a file in variants_folder (without .py) put in front of it:
+variants = [
+    "solution",
+    "tight_menu_loop",
+    "thousands_of_movies",
+    "deep_recursion",
+    "huge_prints",
+]
+# Number of times every input test case is run against each variant:
+rounds = 3
+# capture_variables mode the student's code is run with ("all" is the slowest, see capture_variables_modes):
+capture_variables = "all"
+# Number of slowest phases listed for each variant:
+top_phases = 4
+
+
+def load_input_test_cases():
+    with open(json_file, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+
+def worker_peak_rss_mb():
+    '''Highest peak RSS (VmHWM) of the warm workers that are still running, or None if it can't be read.'''
+    peaks = []
+    pool = conftest._WORKER_POOL
+    for worker in (pool._idle if pool is not None else []):
+        try:
+            with open(f"/proc/{worker.process.pid}/status", "r") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        peaks.append(int(line.split()[1]) / 1024)
+        except OSError:
+            pass
+    return max(peaks) if peaks else None
+
+
+def write_variant(variant, folder):
+    '''Writes the student file for variant into folder and returns its path without .py.'''
+    with open(solution_file, "r", encoding="utf-8") as file:
+        code = file.read()
+    if variant != "solution":
+        with open(os.path.join(variants_folder, f"{variant}.py"), "r", encoding="utf-8") as file:
+            code = f"{file.read()}\n\n{code}"
+    module_to_test = os.path.join(folder, variant)
+    with open(f"{module_to_test}.py", "w", encoding="utf-8") as file:
+        file.write(code)
+    return module_to_test
+
+
+def run_variant(variant):
+    '''Runs every input test case against one variant (in a temporary directory) and returns what was measured.'''
+    input_test_cases = load_input_test_cases()
+    test_name = f"benchmark_{variant}"
+    conftest.execution_cache_enabled = False
+    rec = conftest.pc_get_or_create(test_name, max_score=10)
+    latencies = {"load_student_code": [], "normalize_text": [], "get_similarity_feedback": []}
+
+    launch_dir = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="benchmark_harness_")
+    module_to_test = write_variant(variant, workdir)
+    os.chdir(workdir)
+    start = time.perf_counter()
+    try:
+        for _ in range(rounds):
+            for input_test_case in input_test_cases:
+                case_id = input_test_case["id_input_test_case"]
+                conftest.clear_database('movie')
+
+                stage_start = time.perf_counter()
+                payload = conftest.load_student_code(test_name, input_test_case["inputs"], input_test_case,
+                                                     module_to_test, capture_variables=capture_variables)
+                latencies["load_student_code"].append(time.perf_counter() - stage_start)
+                if payload is None:
+                    continue  # load_student_code already recorded the failure
+
+                # the same steps test_02 takes to look for the expected printed messages
+                stage_start = time.perf_counter()
+                captured_lines = [re.sub(r'\d+(?:\.\d+)?', conftest.round_match, conftest.normalize_text(line))
+                                  for line in payload["captured_output"].splitlines()]
+                captured_str = ' '.join(captured_lines)
+                captured_lines = list(dict.fromkeys(captured_lines))
+                latencies["normalize_text"].append(time.perf_counter() - stage_start)
+
+                expected_phrases = '\n'.join(input_test_case["printed_messages"]).split('\n')
+                expected_matcher = conftest.PhraseMatcher(expected_phrases, round_numbers=True)
+                missing = [phrase for phrase, match in zip(expected_matcher.phrases, expected_matcher.search(captured_str))
+                           if not match]
+
+                # every expected phrase is compared as if it had been misspelled
+                stage_start = time.perf_counter()
+                for expected_phrase in expected_matcher.phrases:
+                    conftest.get_similarity_feedback(expected_phrase + " misspelled", captured_lines)
+                latencies["get_similarity_feedback"].append(time.perf_counter() - stage_start)
+
+                if missing:
+                    rec.fail_case(case_id, reason="missing output", custom_message=f"Missing phrases: {missing}")
+                else:
+                    rec.pass_case(case_id)
+
+        worker_rss = worker_peak_rss_mb()
+        stage_start = time.perf_counter()
+        conftest.pytest_sessionfinish(None)
+        session_finish = time.perf_counter() - stage_start
+        wall_time = time.perf_counter() - start
+    finally:
+        os.chdir(launch_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    phase_totals = conftest.phase_timing_totals(conftest.PHASE_TIMINGS.get(test_name, []))
+    return {
+        "variant": variant,
+        "wall_time": wall_time,
+        "passed": sum(1 for case in rec.cases if case["passed"]),
+        "total": rounds * len(input_test_cases),
+        "peak_rss_mb": peak_rss_mb(),
+        "worker_peak_rss_mb": worker_rss,
+        "pytest_sessionfinish": session_finish,
+        "latencies": latencies,
+        "top_phases": sorted(phase_totals.items(), key=lambda item: item[1], reverse=True)[:top_phases],
+    }
+
+
+def run_variant_in_subprocess(variant):
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), variant], capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        print(f"{variant} failed to run:\n{completed.stderr[-2000:]}")
+        return None
+    return json.loads(lines[-1])
+
+
+def format_mb(value):
+    return f"{value:.0f}" if value is not None else "n/a"
+
+
+def main():
+    if not os.path.exists(solution_file):
+        print(f"Couldn't find {solution_file}. Run this from the root of the repository, with the solution file there.")
+        return
+
+    results = [result for result in map(run_variant_in_subprocess, variants) if result is not None]
+
+    print(f"{rounds} round(s) of every input test case, capture_variables={capture_variables!r}\n")
+    print(f"{'variant':<26}{'wall (s)':>10}{'passed':>10}{'RSS (MB)':>10}{'worker RSS':>12}{'sessionfinish (ms)':>20}")
+    for result in results:
+        passed = f"{result['passed']}/{result['total']}"
+        print(f"{result['variant']:<26}{result['wall_time']:>10.2f}{passed:>10}{format_mb(result['peak_rss_mb']):>10}"
+              f"{format_mb(result['worker_peak_rss_mb']):>12}{result['pytest_sessionfinish'] * 1000:>20.1f}")
+
+    print(f"\nLatency per input test case (ms)\n")
+    print(f"{'variant':<26}{'stage':<26}{'min':>9}{'median':>9}{'p90':>9}{'max':>9}")
+    for result in results:
+        for stage, timings in result["latencies"].items():
+            if not timings:
+                continue
+            print(f"{result['variant']:<26}{stage:<26}{min(timings) * 1000:>9.1f}{statistics.median(timings) * 1000:>9.1f}"
+                  f"{percentile(timings, 0.9) * 1000:>9.1f}{max(timings) * 1000:>9.1f}")
+
+    print(f"\nSlowest phases (total seconds over every run)\n")
+    for result in results:
+        phases = ", ".join(f"{phase} {seconds:.2f}" for phase, seconds in result["top_phases"])
+        print(f"{result['variant']:<26}{phases}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # one variant, run by main() in its own process; prints its results as the last line
+        print(json.dumps(run_variant(sys.argv[1])))
+    else:
+        main()
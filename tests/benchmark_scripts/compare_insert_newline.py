@@ -0,0 +1,117 @@
+'''
+DESCRIPTION:
+
+Checks that insert_newline_at_last_space in conftest.py gives exactly the same
+output as the original version of it (copied below as
+original_insert_newline_at_last_space), and times both on long messages.
+
+The failure messages embed the student's whole program output, so the timing part
+wraps messages of several megabytes: the example outputs from
+input_test_cases_final.json repeated, and a few worst cases (no spaces at all,
+only spaces, and very long words).
+
+It compares random strings made of letters, spaces, tabs and newlines at several
+widths, plus every example output in the JSON file. The script exits with an error
+if any output differs.
+
+Run it from the root of the repository:
+    python tests/benchmark_scripts/compare_insert_newline.py
+'''
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import conftest  # noqa: E402
+
+json_file = r"tests/test_cases/input_test_cases_final.json"
+# Number of random strings to compare, and the longest one to make:
+random_strings = 20_000
+random_string_max_length = 400
+# Characters the random strings are made of:
+random_alphabet = "ab  \n\t\r\xa0"
+# Widths the random strings are wrapped at:
+widths = (1, 2, 5, 10, 74)
+# Sizes (in megabytes) of the long messages that are timed:
+message_sizes_mb = (1, 4)
+
+
+def original_insert_newline_at_last_space(s, width=74):
+    '''insert_newline_at_last_space as it was written before it was made linear-time.'''
+    lines = []
+    current_line = ""
+    for char in s:
+        current_line += char
+        if char == '\n':
+            lines.append(current_line.strip())
+            current_line = ""
+            continue
+        if len(current_line) > width:
+            break_index = current_line.rfind(' ', 0, width)
+            if break_index == -1:
+                break_index = width
+            lines.append(current_line[:break_index].strip())
+            current_line = current_line[break_index:].lstrip()
+    if current_line:
+        lines.append(current_line.strip())
+    return '\n'.join(lines)
+
+
+def compare(strings, label):
+    mismatches = [(s, width) for s in strings for width in widths
+                  if conftest.insert_newline_at_last_space(s, width) != original_insert_newline_at_last_space(s, width)]
+    print(f"{label}: {len(strings)} strings x {len(widths)} widths, {len(mismatches)} different")
+    for s, width in mismatches[:10]:
+        print(f"  width {width}: {s!r}")
+    return not mismatches
+
+
+def make_message(pattern, size_mb):
+    return (pattern * (size_mb * 1024 * 1024 // len(pattern) + 1))[:size_mb * 1024 * 1024]
+
+
+def time_it(function, s):
+    start = time.perf_counter()
+    function(s)
+    return time.perf_counter() - start
+
+
+def main():
+    with open(json_file, "r", encoding="utf-8") as file:
+        example_outputs = [case["example_output"] for case in json.load(file)]
+
+    rng = random.Random(316)
+    fuzz_strings = [
+        "".join(rng.choice(random_alphabet) for _ in range(rng.randint(0, random_string_max_length)))
+        for _ in range(random_strings)
+    ]
+
+    same = compare(example_outputs, "input_test_cases_final.json")
+    same = compare(fuzz_strings, "random strings") and same
+
+    patterns = {
+        "example outputs": "\n".join(example_outputs),
+        "no spaces": "x",
+        "only spaces": " ",
+        "long words": ("y" * 300 + " ") * 3 + "\n",
+    }
+    print(f"\n{'message':<28}{'original':>12}{'new':>12}{'speedup':>10}")
+    for size_mb in message_sizes_mb:
+        for label, pattern in patterns.items():
+            message = make_message(pattern, size_mb)
+            original_seconds = time_it(original_insert_newline_at_last_space, message)
+            new_seconds = time_it(conftest.insert_newline_at_last_space, message)
+            same = (conftest.insert_newline_at_last_space(message)
+                    == original_insert_newline_at_last_space(message)) and same
+            print(f"{f'{label}, {size_mb} MB':<28}{original_seconds:>11.3f}s{new_seconds:>11.3f}s"
+                  f"{original_seconds / new_seconds:>9.1f}x")
+
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
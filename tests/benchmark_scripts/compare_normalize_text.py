@@ -0,0 +1,116 @@
+'''
+DESCRIPTION:
+
+Checks that normalize_text in conftest.py gives exactly the same output as the
+original version of it (copied below as original_normalize_text), and times both.
+
+It compares every string in input_test_cases_final.json (and every line of those
+strings), plus random strings made of the characters normalize_text treats
+specially (whitespace, periods, colons, hyphens, digits, symbols, and some
+non-ASCII letters). The script exits with an error if any output differs.
+
+Run it from the root of the repository:
+    python tests/benchmark_scripts/compare_normalize_text.py
+'''
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections.abc import Iterable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import conftest  # noqa: E402
+
+json_file = r"tests/test_cases/input_test_cases_final.json"
+# Number of random strings to compare, and the longest one to make:
+random_strings = 200_000
+random_string_max_length = 40
+# Characters the random strings are made of:
+random_alphabet = (
+    "aZ09 -.:_!?()[]\\/'\"$%,;<=>@^`{|}~#&*+"
+    "\n\t\r\x0b\x0c\x1c\xa0 　"
+    "ÄİßΣЖé"
+)
+
+
+def original_normalize_text(text):
+    '''normalize_text as it was written before it was precompiled and memoized.'''
+    if isinstance(text, str):
+        text = text.lower()
+        text = text.replace('\n', ' ')
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'(?<!\d)\.(?!\d)', '', text)
+        text = re.sub(r'(:)(\S)', r'\1 \2', text)
+        text = re.sub(r'[!"#$%&\'()*+,/:;<=>?@\[\]^_`{|}~]', '', text)
+        text = re.sub(r'((?<=^)|(?<=\s))-(?=\d)', 'NEG_SIGN_PLACEHOLDER', text)
+        text = text.replace('-', ' ')
+        text = re.sub(r'\s+', ' ', text)
+        text = text.replace('NEG_SIGN_PLACEHOLDER', '-')
+        return text.strip()
+    elif isinstance(text, dict):
+        return {original_normalize_text(k): original_normalize_text(v) for k, v in text.items()}
+    elif isinstance(text, Iterable) and not isinstance(text, (str, bytes)):
+        return type(text)(original_normalize_text(item) for item in text)
+    else:
+        return text
+
+
+def collect_strings(value, strings):
+    if isinstance(value, str):
+        strings.append(value)
+        strings.extend(value.splitlines())
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            collect_strings(k, strings)
+            collect_strings(v, strings)
+    elif isinstance(value, list):
+        for item in value:
+            collect_strings(item, strings)
+
+
+def compare(strings, label):
+    mismatches = [s for s in strings if conftest.normalize_text(s) != original_normalize_text(s)]
+    print(f"{label}: {len(strings)} strings, {len(mismatches)} different")
+    for s in mismatches[:10]:
+        print(f"  {s!r}\n    original: {original_normalize_text(s)!r}\n    new:      {conftest.normalize_text(s)!r}")
+    return not mismatches
+
+
+def time_it(function, strings, repeats=5):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for s in strings:
+            function(s)
+    return (time.perf_counter() - start) / (repeats * len(strings)) * 1e6
+
+
+def main():
+    with open(json_file, "r", encoding="utf-8") as file:
+        json_strings = []
+        collect_strings(json.load(file), json_strings)
+
+    rng = random.Random(303)
+    fuzz_strings = [
+        "".join(rng.choice(random_alphabet) for _ in range(rng.randint(0, random_string_max_length)))
+        for _ in range(random_strings)
+    ]
+
+    same = compare(json_strings, "input_test_cases_final.json")
+    same = compare(fuzz_strings, "random strings") and same
+
+    conftest._normalize_string.cache_clear()
+    uncached = time_it(conftest._normalize_string.__wrapped__, json_strings)
+    cached = time_it(conftest.normalize_text, json_strings)
+    original = time_it(original_normalize_text, json_strings)
+    print(f"\nper string (input_test_cases_final.json): original {original:.2f} us, "
+          f"new {uncached:.2f} us, new with memo {cached:.2f} us")
+
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
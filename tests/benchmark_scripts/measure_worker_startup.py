@@ -0,0 +1,109 @@
+'''
+DESCRIPTION:
+
+Measures how long it takes to run one input test case, start to finish, depending
+on how the process that runs the student's code gets started:
+
+- "cold (Process + Manager)": what the tests used to do for every input test case.
+  They started a new Manager server process and a new Process, and the student's
+  code imported peewee from scratch.
+- "<method>, new worker": a worker from the StudentCodeWorkerPool that is started
+  just for this case, using that multiprocessing start method. With forkserver, the
+  worker is forked from a server that has already imported sqlite3, peewee, and conftest.
+- "<method>, warm worker": the same worker is reused from case to case, which is
+  what happens most of the time during a test run.
+
+Run it from the root of the repository:
+    python tests/benchmark_scripts/measure_worker_startup.py
+'''
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import conftest  # noqa: E402
+
+# Number of times each way of starting is measured:
+rounds = 15
+# Which input test case to run (by index in input_test_cases_final.json):
+input_test_case_index = 0
+json_file = r"tests/test_cases/input_test_cases_final.json"
+
+
+def load_input_test_case():
+    with open(json_file, "r", encoding="utf-8") as file:
+        return json.load(file)[input_test_case_index]
+
+
+def run_cold(input_test_case):
+    '''Runs one case the way load_student_code did before the worker pool (new Manager + Process).'''
+    conftest.clear_database('movie')
+    manager = multiprocessing.Manager()
+    try:
+        shared_data = manager.dict()
+        p = multiprocessing.Process(target=conftest._load_student_code_subprocess,
+                                    args=(shared_data, "measure_worker_startup", input_test_case["inputs"],
+                                          input_test_case, conftest.default_module_to_test, None, None))
+        p.start()
+        p.join(conftest.default_timeout_seconds)
+        return dict(shared_data).get('status')
+    finally:
+        manager.shutdown()
+
+
+def run_on_pool(pool, input_test_case):
+    conftest.clear_database('movie')
+    task = (None, input_test_case["inputs"], input_test_case, conftest.default_module_to_test, None, None, None, None, "all")
+    timed_out, shared_data = pool.run(task, conftest.default_timeout_seconds)
+    return 'timeout' if timed_out else shared_data.get('status')
+
+
+def measure(label, run_once):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        status = run_once()
+        timings.append(time.perf_counter() - start)
+        if status != 'success':
+            print(f"  {label}: a run finished with status {status!r}")
+    return label, timings
+
+
+def main():
+    input_test_case = load_input_test_case()
+    results = [measure("cold (Process + Manager)", lambda: run_cold(input_test_case))]
+
+    for method in ("fork", "forkserver", "spawn"):
+        if method not in multiprocessing.get_all_start_methods():
+            continue
+        conftest.worker_start_method = method
+        context = conftest.get_worker_context()
+
+        # max_tasks=1 retires the worker after every case, so each case gets a brand-new one
+        pool = conftest.StudentCodeWorkerPool(size=1, max_tasks=1, context=context)
+        run_on_pool(pool, input_test_case)  # starts the forkserver (if any) before timing
+        results.append(measure(f"{method}, new worker", lambda: run_on_pool(pool, input_test_case)))
+        pool.shutdown()
+
+        pool = conftest.StudentCodeWorkerPool(size=1, context=context)
+        run_on_pool(pool, input_test_case)
+        results.append(measure(f"{method}, warm worker", lambda: run_on_pool(pool, input_test_case)))
+        pool.shutdown()
+
+    conftest.clear_database('movie')
+
+    baseline = statistics.median(results[0][1])
+    print(f"Input test case {input_test_case['id_input_test_case']}, {rounds} rounds each (times in ms)\n")
+    print(f"{'':<28}{'median':>10}{'mean':>10}{'min':>10}{'max':>10}{'speedup':>10}")
+    for label, timings in results:
+        median = statistics.median(timings)
+        print(f"{label:<28}{median * 1000:>10.1f}{statistics.mean(timings) * 1000:>10.1f}"
+              f"{min(timings) * 1000:>10.1f}{max(timings) * 1000:>10.1f}{baseline / median:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
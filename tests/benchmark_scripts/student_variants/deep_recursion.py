@@ -0,0 +1,21 @@
+# Benchmark variant (see benchmark_harness.py), run in front of the solution: before every input(),
+# a recursive helper goes several hundred calls deep, and the input itself is asked for from
+# hundreds of calls down the stack.
+solution_input = input
+
+
+def count_down(n):
+    if n == 0:
+        return 0
+    return 1 + count_down(n - 1)
+
+
+def deep_input(prompt, depth):
+    if depth == 0:
+        return solution_input(prompt)
+    return deep_input(prompt, depth - 1)
+
+
+def input(prompt=""):
+    count_down(600)
+    return deep_input(prompt, 300)
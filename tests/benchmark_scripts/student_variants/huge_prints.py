@@ -0,0 +1,15 @@
+# Benchmark variant (see benchmark_harness.py), run in front of the solution: prints a long loading
+# log (and one very long line) before every input(), so every case has megabytes of output to
+# capture, send back and search.
+solution_input = input
+
+
+def show_loading_screen():
+    for page in range(1, 2001):
+        print(f"Loading catalogue page {page} of 2000...")
+    print("=" * 100_000)
+
+
+def input(prompt=""):
+    show_loading_screen()
+    return solution_input(prompt)
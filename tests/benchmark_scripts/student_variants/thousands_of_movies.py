@@ -0,0 +1,17 @@
+# Benchmark variant (see benchmark_harness.py), run in front of the solution: the first time the
+# solution asks for input, fills the database with thousands of movies (and keeps them all in a list)
+# before clearing them out again. Movie and db are the solution's, defined by the time input() is called.
+solution_input = input
+catalogue = None
+
+
+def input(prompt=""):
+    global catalogue
+    if catalogue is None:
+        # checks that the watchlist can handle a big catalogue before the first choice
+        with db.atomic():
+            for number in range(3000):
+                Movie.create(name=f"Placeholder movie {number}", year_released=2000)
+        catalogue = [movie.get_info() for movie in Movie.select()]
+        Movie.delete().execute()
+    return solution_input(prompt)
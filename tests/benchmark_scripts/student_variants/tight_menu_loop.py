@@ -0,0 +1,21 @@
+# Benchmark variant (see benchmark_harness.py), run in front of the solution: every print() goes
+# through a tight loop of small function calls first, so the tracer sees thousands of calls and
+# returns (and captures their locals) every time the menu is shown.
+import builtins
+
+
+def padded_line(text, width):
+    # builds the line one character at a time, pads it to width, then trims the padding back off
+    padded = ""
+    for character in text:
+        padded += character
+    while len(padded) < width:
+        padded += " "
+    return padded.rstrip()
+
+
+def print(*args, **kwargs):
+    # redraws the line until it "settles"
+    for _ in range(200):
+        lines = [padded_line(str(arg), 80) for arg in args]
+    builtins.print(*lines, **kwargs)
@@ -8,10 +8,12 @@ if they reference it as a parameter.
 # =======
 
 import pytest, re, sys, os, json, traceback, pickle, inspect, multiprocessing, \
-       ast, importlib, difflib, copy, builtins, sqlite3, csv,  types, site, sysconfig
+       ast, importlib, difflib, copy, builtins, sqlite3, csv,  types, site, sysconfig, collections, \
+       atexit, gc, threading, hashlib, tempfile, shutil, concurrent.futures, math, functools, \
+       time, contextlib, weakref, operator, warnings
 from io import StringIO
 from collections.abc import Iterable
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
 # ====================
 # LOCAL MODULE IMPORTS
@@ -30,6 +32,7 @@ sys.path.append(test_cases_path)
 
 from class_test_cases import test_cases_classes_dict # type: ignore
 from function_test_cases import test_cases_functions_dict # type: ignore
+from database_templates import database_templates_dict # type: ignore
 
 def load_env_file(path):
     if not os.path.exists(path):
@@ -72,6 +75,84 @@ default_module_to_test_2 = detect_module(solution_module_2, student_module_2)
 # default per-test-case timeout amount in seconds:
 default_timeout_seconds = 10
 
+# number of warm worker processes kept around to run the student's code (which is also how many
+# input test cases load_student_code_in_parallel runs at once), and how many input test cases
+# a single worker runs before it is replaced with a fresh one. The WORKER_POOL_SIZE environment
+# variable overrides the pool size (grade_submissions.py sets it to 1, since it grades submissions in parallel).
+worker_pool_size = int(os.getenv("WORKER_POOL_SIZE", 0)) or os.cpu_count() or 1
+worker_max_tasks = 50
+
+# how worker processes are started. "forkserver" starts a server process once, which imports sqlite3,
+# peewee and this file, and every worker is forked from that already-warm process. Use "fork" or "spawn"
+# to force one of those instead, or None for the platform default (also used wherever forkserver isn't
+# available, like on Windows). Like with spawn, a script that runs student code through this file needs
+# the usual `if __name__ == "__main__":` guard, since workers import the script's main module.
+worker_start_method = "forkserver"
+
+# largest result (pickled size in bytes) a worker may send back for one input test case. Anything bigger
+# (almost always an endless loop of print() calls) is reported as an error instead of being sent to the tests.
+max_result_bytes = 16 * 1024 * 1024
+
+# most output (in bytes, as UTF-8) the student's code may print during one input test case. Past that, the
+# case is stopped right away and fails with an "excessive output" error showing the number of lines printed
+# and the first and last excessive_output_window_chars characters of the output (see BoundedOutput).
+max_output_bytes = 8 * 1024 * 1024
+excessive_output_window_chars = 1000
+
+# a case is stopped early as an endless loop once the student's code has made the exact same input() call
+# loop_detection_repeats times without using up any input (e.g., after the inputs ran out): the same prompt,
+# from the same line, with the same output printed since the input() call before it. See LoopDetector.
+# 0 turns it off.
+loop_detection_repeats = 1000
+
+# reuse the result of an input test case (and the movies.db it left behind) when a later
+# test runs the same inputs against the same code and starting database.
+execution_cache_enabled = True
+
+# if the GRADE_CACHE environment variable is set to 1, the result of each whole test is saved on disk, and
+# replayed instead of rerunning the test the next time the tests run on a student file with the same
+# normalized AST (so edits that only touch comments or formatting don't run the student's code again),
+# as long as the local modules it imports, this file, the test files and test_cases are unchanged too
+# (see GRADE CACHE). It is off by default, so a normal run always runs the student's code; grade_submissions.py
+# turns it on for its graders. The cache lives outside the repository (set GRADE_CACHE_DIR to move it),
+# so it never gets pushed with the student's code.
+grade_cache_enabled = os.getenv("GRADE_CACHE", "0") != "0"
+grade_cache_folder = os.getenv("GRADE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "grade_cache")
+# A test file that checks the text of the student's file (comments included) rather than what it does
+# sets grade_cache_exact_source = True at the top, so its tests are only replayed when the file is exactly the same.
+
+# where the student's code reads and writes movies.db while an input test case runs:
+#   "shared"  - the movies.db in the current directory, like running the code by hand
+#   "tempdir" - a copy of it in a temporary directory made for that case (the default)
+#   "memory"  - a copy of it in a shared-cache in-memory SQLite database (sqlite3.connect is redirected
+#               for that one file, so nothing is written to disk while the code runs). This only works
+#               if the student's code opens movies.db through the standard sqlite3 module; if it doesn't
+#               (e.g., peewee picked up pysqlite3), the case just uses the movies.db on disk instead.
+#               It needs Python 3.11+ (sqlite3 can't serialize a database before that); on older versions
+#               "tempdir" is used instead, with a warning.
+# With "tempdir" and "memory", the database the case ends with is written back to movies.db afterwards,
+# so sqlite_db_exists and the table checks work the same in every mode.
+database_isolation_modes = ("shared", "tempdir", "memory")
+database_isolation = "tempdir"
+
+# which backend traces the student's code: "monitoring" uses sys.monitoring (PEP 669, Python 3.12+),
+# "settrace" uses sys.settrace, and "auto" picks monitoring whenever it is available.
+trace_backend = "auto"
+
+# how the locals of the student's functions are captured into all_variables each time a function returns
+# or raises. Tests pick a mode with the capture_variables argument of load_student_code:
+#   "all"     - every snapshot (the default)
+#   "last"    - only the last captured_snapshots_per_variable snapshots of each variable
+#   "changed" - only snapshots whose value is different from the one before it
+#   "none"    - nothing is serialized at all, and all_variables comes back empty
+capture_variables_modes = ("all", "last", "changed", "none")
+captured_snapshots_per_variable = 5
+
+# every run of the student's code records how long each of its phases took (see PHASE TIMINGS).
+# If this is True (or the PHASE_TIMINGS environment variable is set to 1), they are written to
+# tests/test_phase_timings.csv after the tests finish, and TEST_RESULTS_SUMMARY.md also gets a breakdown per test.
+phase_timings_in_summary = os.getenv("PHASE_TIMINGS", "0") == "1"
+
 # default decimal place to round to for regex comparisons
 # helpful for accounting for different rounding methods students could use.
 global_decimal_places = 2
@@ -125,6 +206,14 @@ def function_test_cases():
 def class_test_cases(): 
     return test_cases_classes_dict
 
+@pytest.fixture
+def database_template():
+    """
+    Returns restore_database_template, so a test can start from a prebuilt database, e.g.
+    database_template("two_movies_one_watched") and then only run ["4", "6"] as inputs.
+    """
+    return restore_database_template
+
 @pytest.fixture
 def current_test_name(request):
     return request.node.name
@@ -152,14 +241,53 @@ def pytest_runtest_call(item):
         print(f"{test_name} has already been run in this session")
 
 
+# tests replayed from the grade cache in this session (so their results aren't saved again)
+_replayed_tests = set()
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """
+    Replays a test from the grade cache instead of running it, if it has a result saved for this
+    student file (see GRADE CACHE). The saved cases go back into PC_RESULTS, and
+    pc_finalize_and_maybe_fail passes or fails the test the same way it did when it really ran.
+    """
+    if not grade_cache_enabled:
+        return None
+    key = grade_cache_key(pyfuncitem.name, exact_source=grades_exact_source(pyfuncitem))
+    cached = read_grade_cache(key) if key else None
+    if cached is None:
+        return None
+
+    rec = PartialCreditRecorder(cached["test_id"], cached["max_score"])
+    rec.cases = cached["cases"]
+    PC_RESULTS[rec.test_id] = rec
+    _replayed_tests.add(pyfuncitem.name)
+    print(f"{rec.test_id}: replayed from the grade cache")
+    pc_finalize_and_maybe_fail(rec)
+    return True
+
+def pytest_runtest_teardown(item):
+    """Saves the result of a test that really ran to the grade cache."""
+    if grade_cache_enabled and item.name not in _replayed_tests and item.name in PC_RESULTS:
+        key = grade_cache_key(item.name, exact_source=grades_exact_source(item))
+        if key:
+            write_grade_cache(key, PC_RESULTS[item.name])
+
+
 def pytest_sessionfinish(session, exitstatus=None):
     """
     After all tests finish, emit:
       - TEST_RESULTS_SUMMARY.md (summary table + per-test collapsible details; error-first layout)
       - test_scores.csv (rows per test + TOTAL row)
+      - test_phase_timings.csv, if phase_timings_in_summary is on (see PHASE TIMINGS; also added to the summary)
     """
+    session_timer = PhaseTimer()
+    with session_timer.phase('worker_pool_shutdown'):
+        shutdown_worker_pool()
+
     if not PC_RESULTS:
         return
+    report_start = time.perf_counter()
 
     # -------- Load input test cases for rich MD details (with path fallbacks) --------
     input_cases_by_id = {}
@@ -330,6 +458,9 @@ def pytest_sessionfinish(session, exitstatus=None):
         md.append("</details>\n")  # end test-level collapsible
         md.append("<br>\n")  # spacer between tests
 
+    if phase_timings_in_summary and PHASE_TIMINGS:
+        md.extend(phase_timings_markdown())
+
     # VS Code occasionally doesn't reload the preview when writing the test results file.
     # Rewriting the file from a temp file seems to fix that issue.
     tmp = "TEST_RESULTS_SUMMARY.tmp.md"
@@ -348,6 +479,11 @@ def pytest_sessionfinish(session, exitstatus=None):
             writer.writerow([row["test_id"], row["passed"], row["total"], row["points"], row["max_score"], row["per_case"]])
         writer.writerow(["TOTAL", "", "", round(total_points, 2), total_possible, ""])
 
+    session_timer.add('report_generation', time.perf_counter() - report_start)
+    SESSION_PHASE_TIMINGS.update(session_timer.phases)
+    if phase_timings_in_summary:
+        write_phase_timings_csv()
+
     # One-line terminal total
     print(f"\n==> TOTAL SCORE: {round(total_points, 2)}/{total_possible} points\n")
 
@@ -436,6 +572,101 @@ def record_failure(current_test_name, *, formatted_message, input_test_case=None
     return
 
 
+# =============
+# PHASE TIMINGS
+# =============
+# Where the time of a run of the student's code goes. Each phase is only listed if it happened:
+#   cache_lookup      - hashing the student's file and movies.db for the session execution cache
+#   cache_restore     - putting movies.db back the way a cached run left it (instead of running the code)
+#   database_setup    - copying movies.db to where the case runs (tempdir or memory isolation)
+#   worker_start      - starting a new worker process (0 when a warm worker was free)
+#   setup             - reading, parsing and compiling the student's code and setting up tracing (in the worker)
+#   exec              - running the student's code, including the tracer but not serialize_object
+#   serialize_object  - capturing the student's locals while tracing (see capture_variables_modes)
+#   function_tests    - running function_tests against the student's code
+#   class_tests       - running class_tests against the student's code
+#   clean_variables   - filtering and cleaning all_variables with _keep_symbol and _clean_value
+#   database_close    - reading the in-memory database back out at the end of the case
+#   worker_reset      - putting the worker back the way it started
+#   ipc               - pickling, sending and waiting on the task and its result (round trip minus the worker's phases)
+#   unpickle          - unpickling the result in the tests' process
+#   timeout           - waiting on a case that never finished
+#   database_publish  - writing the database the case ended with back to movies.db
+#   cache_store       - saving the result in the session execution cache
+#   report            - turning the result into a payload or a recorded failure
+# Runs in load_student_code_in_parallel overlap, so their phases can add up to more than the wall time.
+
+# test name -> one {'case_id', 'phases'} per run of the student's code, in the order they were recorded
+PHASE_TIMINGS = {}
+
+# phases that happen once per session instead of once per run, as phase -> seconds
+SESSION_PHASE_TIMINGS = {}
+
+class PhaseTimer:
+    """
+    Adds up how many seconds each phase of a run takes. Time spent in the same phase
+    more than once (e.g., serialize_object) is added together.
+    """
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+
+def record_phase_timings(current_test_name, input_test_case, timer):
+    case_id = (input_test_case or {}).get("id_input_test_case")
+    PHASE_TIMINGS.setdefault(current_test_name, []).append({"case_id": case_id, "phases": dict(timer.phases)})
+
+def phase_timing_totals(runs):
+    """Seconds per phase added up over runs (a list from PHASE_TIMINGS), in the order phases first appear."""
+    totals = {}
+    for run in runs:
+        for phase, seconds in run["phases"].items():
+            totals[phase] = totals.get(phase, 0.0) + seconds
+    return totals
+
+def phase_timings_markdown():
+    """The per-test breakdown added to TEST_RESULTS_SUMMARY.md when phase_timings_in_summary is on."""
+    md = ["# Phase Timings\n"]
+    md.append("_How long each phase of running your code took, added up over every run of it in each test._\n")
+    for test_id, runs in PHASE_TIMINGS.items():
+        totals = phase_timing_totals(runs)
+        total = sum(totals.values())
+        md.append(f"<details><summary>{test_id}: {total:.3f} s over {len(runs)} run(s)</summary>\n")
+        md.append("| Phase | Total (s) | Mean per run (ms) | Share |")
+        md.append("|---|---:|---:|---:|")
+        for phase, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+            share = seconds / total if total else 0.0
+            md.append(f"| {phase} | {seconds:.3f} | {seconds / len(runs) * 1000:.1f} | {share:.0%} |")
+        md.append("</details>\n")
+    return md
+
+def write_phase_timings_csv(csv_out_path=os.path.join("tests", "test_phase_timings.csv")):
+    """
+    One row per phase of every run in PHASE_TIMINGS (run numbers count up within each test),
+    then the SESSION_PHASE_TIMINGS with test_id SESSION.
+    """
+    os.makedirs(os.path.dirname(csv_out_path), exist_ok=True)
+    with open(csv_out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["test_id", "run", "case_id", "phase", "seconds"])
+        for test_id, runs in PHASE_TIMINGS.items():
+            for run_number, run in enumerate(runs, start=1):
+                for phase, seconds in run["phases"].items():
+                    writer.writerow([test_id, run_number, run["case_id"], phase, f"{seconds:.6f}"])
+        for phase, seconds in SESSION_PHASE_TIMINGS.items():
+            writer.writerow(["SESSION", "", "", phase, f"{seconds:.6f}"])
+
+
 # =================================
 # RUNNING STUDENT CODE SUBPROCESSES
 # =================================
@@ -544,67 +775,807 @@ def _clean_value(value, *, depth=0, max_depth=3, max_items=50):
     return repr(value)[:200]
 
 
+# ================
+# WARM WORKER POOL
+# ================
+
+# Modules imported once when a worker starts, so each input test case doesn't pay for them.
+_WORKER_PRELOAD_MODULES = ("sqlite3", "peewee")
+
+# Globals that workers read while running a case. They are sent along with every task, since a worker
+# started by the forkserver (or spawn) has its own fresh copy of this module.
+_WORKER_SETTINGS = ("trace_backend", "max_result_bytes", "captured_snapshots_per_variable", "max_output_bytes",
+                    "excessive_output_window_chars", "loop_detection_repeats")
+
+# Module-level counters in preloaded modules that the student's code bumps, as (module, class, attribute).
+# peewee numbers every Field it creates, which shows up in the serialized variables.
+_WORKER_RESET_ATTRIBUTES = (("peewee", "Field", "_field_counter"),)
+
+def _snapshot_worker_state():
+    """
+    Records the parts of the interpreter the student's code (or _load_student_code_subprocess)
+    can change, so a worker can be put back the way it started between input test cases.
+    """
+    return {
+        'cwd': os.getcwd(),
+        'sys_path': list(sys.path),
+        'modules': set(sys.modules),
+        'environ': dict(os.environ),
+        'recursion_limit': sys.getrecursionlimit(),
+        'exit': builtins.exit,
+        'quit': builtins.quit,
+        'sys_exit': sys.exit,
+        'input': builtins.input,
+        'print': builtins.print,
+        'stdout': sys.stdout,
+        'stderr': sys.stderr,
+        'stdin': sys.stdin,
+        'attributes': {
+            (module_name, owner_name, attr): getattr(getattr(sys.modules[module_name], owner_name), attr)
+            for module_name, owner_name, attr in _WORKER_RESET_ATTRIBUTES
+            if hasattr(getattr(sys.modules.get(module_name), owner_name, None), attr)
+        },
+    }
+
+def _reset_worker_state(baseline):
+    """Puts a worker back into the state recorded by _snapshot_worker_state."""
+    sys.settrace(None)
+    threading.settrace(None)
+    sys.stdout, sys.stderr, sys.stdin = baseline['stdout'], baseline['stderr'], baseline['stdin']
+    builtins.exit, builtins.quit, sys.exit = baseline['exit'], baseline['quit'], baseline['sys_exit']
+    builtins.input, builtins.print = baseline['input'], baseline['print']
+    sys.setrecursionlimit(baseline['recursion_limit'])
+    sys.path[:] = baseline['sys_path']
+    if os.environ != baseline['environ']:
+        os.environ.clear()
+        os.environ.update(baseline['environ'])
+    try:
+        os.chdir(baseline['cwd'])
+    except OSError:
+        pass
+    for (module_name, owner_name, attr), value in baseline['attributes'].items():
+        setattr(getattr(sys.modules[module_name], owner_name), attr, value)
+
+    # Forget any of the student's own modules so the next case imports them fresh.
+    # Standard library and site-packages modules imported along the way stay warm.
+    for name in set(sys.modules) - baseline['modules']:
+        module = sys.modules.get(name)
+        if module is not None and is_user_defined_module(module):
+            del sys.modules[name]
+
+    # Drops the student's objects (and closes any database connections they left open)
+    gc.collect()
+
+def _student_code_worker_loop(conn):
+    """
+    Main loop of a warm worker process. Receives one input test case at a time over conn
+    (along with the directory it was launched from and the _WORKER_SETTINGS), runs it through
+    _load_student_code_subprocess, and sends back the same shared_data dictionary the Manager
+    used to hold, as a single pickle (see _encode_worker_result). A None task tells the worker to exit.
+    """
+    for module_name in _WORKER_PRELOAD_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+    baseline = _snapshot_worker_state()
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        launch_dir, settings, task = task
+
+        shared_data = {}
+        try:
+            globals().update(settings)
+            os.chdir(launch_dir)
+            _load_student_code_subprocess(shared_data, *task)
+        finally:
+            reset_start = time.perf_counter()
+            _reset_worker_state(baseline)
+            if 'timings' in shared_data:
+                shared_data['timings']['worker_reset'] = time.perf_counter() - reset_start
+        conn.send_bytes(_encode_worker_result(shared_data))
+
+    conn.close()
+
+def _encode_worker_result(shared_data):
+    """
+    Pickles shared_data in one go so it can be sent back with a single send_bytes. If it is bigger than
+    max_result_bytes (or can't be pickled at all), a small exception result is sent back instead,
+    so a runaway print() loop can't flood the pipe and stall the tests.
+    """
+    try:
+        data = pickle.dumps(shared_data, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        error_type = type(e).__name__
+        message = (f"The results of running your code could not be sent back to the automated tests ({e}). "
+                   f"Contact your professor.")
+    else:
+        if len(data) <= max_result_bytes:
+            return data
+        error_type = 'ResultTooLarge'
+        message = (f"Your code produced too much data for the automated tests to check "
+                   f"({len(data) / (1024 * 1024):.1f} MB, the limit is {max_result_bytes / (1024 * 1024):.1f} MB). "
+                   f"This is usually caused by a loop that prints over and over without ever ending. "
+                   f"Make sure every loop in your code stops once the inputs from the test case have been entered.")
+
+    not_sent = {
+        'status': 'exception',
+        'payload': {'type': error_type, 'message': message, 'traceback': None,
+                    'custom_location': "No location available."},
+    }
+    return pickle.dumps(not_sent, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class _StudentCodeWorker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_student_code_worker_loop, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks_run = 0
+
+    def stop(self, graceful=True):
+        if graceful and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class StudentCodeWorkerPool:
+    """
+    Starting a new Process (plus a Manager server process) for every input test case
+    took most of the time of a test run. This keeps warm worker processes around instead.
+    Workers are reset between cases, and are thrown away and replaced if a case times out,
+    if the worker crashes, or after max_tasks cases.
+    """
+
+    def __init__(self, size=worker_pool_size, max_tasks=worker_max_tasks, context=None):
+        self.size = max(1, size)
+        self.max_tasks = max_tasks
+        self.context = context or get_worker_context()
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _StudentCodeWorker(self.context)
+
+    def _release(self, worker):
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def run(self, task, timeout, timer=None):
+        """
+        Runs one input test case on a warm worker.
+        Returns (timed_out, shared_data). shared_data is empty if the worker died without answering.
+        If a PhaseTimer is given, the worker's phases and the time spent around them are added to it.
+        """
+        timer = timer or PhaseTimer()
+        with timer.phase('worker_start'):
+            worker = self._acquire()
+        try:
+            round_trip_start = time.perf_counter()
+            worker.conn.send((os.getcwd(), {name: globals()[name] for name in _WORKER_SETTINGS}, task))
+            if not worker.conn.poll(timeout):
+                # The case is still running; terminate the worker rather than wait on it
+                timer.add('timeout', time.perf_counter() - round_trip_start)
+                worker.stop(graceful=False)
+                return True, None
+            # the worker never sends more than max_result_bytes; anything longer means it is broken
+            data = worker.conn.recv_bytes(max_result_bytes + 64 * 1024)
+            round_trip = time.perf_counter() - round_trip_start
+            with timer.phase('unpickle'):
+                shared_data = pickle.loads(data)
+        except (EOFError, OSError, pickle.UnpicklingError):
+            # The worker crashed or exited before it could send anything back
+            worker.stop(graceful=False)
+            return False, {}
+
+        worker_timings = shared_data.pop('timings', None) or {}
+        for phase, seconds in worker_timings.items():
+            timer.add(phase, seconds)
+        timer.add('ipc', max(0.0, round_trip - sum(worker_timings.values())))
+
+        worker.tasks_run += 1
+        if worker.tasks_run >= self.max_tasks:
+            worker.stop()
+        else:
+            self._release(worker)
+        return False, shared_data
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_WORKER_POOL = None
+# get_worker_pool is called from the threads in load_student_code_in_parallel, so the pool is created
+# under this lock (otherwise two threads can each start one, and the one that loses is never shut down)
+_WORKER_POOL_LOCK = threading.Lock()
+
+def get_worker_context():
+    """
+    The multiprocessing context workers are started with (see worker_start_method). With forkserver,
+    sqlite3, peewee and this module are imported once in the server, so new workers start warm.
+    """
+    if worker_start_method not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context(worker_start_method)
+    if worker_start_method == "forkserver":
+        from multiprocessing import forkserver
+        context.set_forkserver_preload([*_WORKER_PRELOAD_MODULES, __name__])
+        # The forkserver doesn't get this process's sys.path (the preload silently skips anything it can't
+        # import), so it is started with the folder this file is in on PYTHONPATH for the duration.
+        old_pythonpath = os.environ.get("PYTHONPATH")
+        os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [CURRENT_DIR, old_pythonpath]))
+        try:
+            forkserver.ensure_running()
+        finally:
+            if old_pythonpath is None:
+                del os.environ["PYTHONPATH"]
+            else:
+                os.environ["PYTHONPATH"] = old_pythonpath
+    return context
+
+def get_worker_pool():
+    global _WORKER_POOL
+    with _WORKER_POOL_LOCK:
+        if _WORKER_POOL is None:
+            _WORKER_POOL = StudentCodeWorkerPool()
+        return _WORKER_POOL
+
+@atexit.register
+def shutdown_worker_pool():
+    global _WORKER_POOL
+    with _WORKER_POOL_LOCK:
+        pool, _WORKER_POOL = _WORKER_POOL, None
+    if pool is not None:
+        pool.shutdown()
+
+
 def load_student_code(current_test_name, inputs, input_test_case=None, module_to_test=default_module_to_test,
-                      function_tests=None, class_tests=None):
+                      function_tests=None, class_tests=None, capture_variables="all"):
     """
     Loads the student's code in a subprocess with mocked inputs to prevent hanging the main test process.
+    The subprocess is one of the warm workers from the StudentCodeWorkerPool, and results are reused
+    from the session execution cache when the same case has already been run.
+    Tests that never look at all_variables should pass capture_variables="none" (see capture_variables_modes).
 
     If code is successfully executed, will return:
     captured_input_prompts, captured_output, module_globals, function_results, class_results, raised_exceptions
     """
+    timer = PhaseTimer()
     try:
-        # Create a Manager object and dictionary to communicate with the subprocess
-        manager = multiprocessing.Manager()
-        shared_data = manager.dict()
+        timed_out, shared_data = run_student_code(inputs, input_test_case, module_to_test, function_tests, class_tests,
+                                                  capture_variables=capture_variables, timer=timer)
+        with timer.phase('report'):
+            return report_student_code_result(timed_out, shared_data, current_test_name, input_test_case)
+    except Exception as e:
+        exception_message_for_students(e, input_test_case, current_test_name)
+    finally:
+        record_phase_timings(current_test_name, input_test_case, timer)
 
-        # Start the subprocess
-        p = multiprocessing.Process(target=_load_student_code_subprocess,
-                                    args=(shared_data, current_test_name, inputs, input_test_case, module_to_test, function_tests, class_tests))
-        p.start()
+def report_student_code_result(timed_out, shared_data, current_test_name, input_test_case=None):
+    """
+    Turns what came back from run_student_code into either the payload (on success)
+    or a recorded failure for the current test (returns None).
+    """
+    if timed_out:
+        # Handle timeout (the pool has already terminated and replaced the worker)
+        timeout_message = timeout_message_for_students(input_test_case, current_test_name)
+        record_failure(current_test_name, formatted_message=timeout_message, input_test_case=input_test_case, reason="timeout error")
 
-        # Wait for the subprocess to finish, or continue if the timeout limit is reached
-        p.join(default_timeout_seconds)
+    else:
+        # Subprocess finished; get the result
+        if 'status' in shared_data:
+            status = shared_data['status']
+            if status == 'success':
+                return shared_data['payload']
+            elif status == 'exception':
+                exception_data = shared_data['payload']  # Exception data dictionary
+                exception_message_for_students(exception_data, input_test_case, current_test_name)
+            elif status == 'excessive_output':
+                excessive_output_message = excessive_output_message_for_students(shared_data['payload'], input_test_case, current_test_name)
+                record_failure(current_test_name, formatted_message=excessive_output_message, input_test_case=input_test_case, reason="excessive output")
+            elif status == 'infinite_loop':
+                infinite_loop_message = infinite_loop_message_for_students(shared_data['payload'], input_test_case, current_test_name)
+                record_failure(current_test_name, formatted_message=infinite_loop_message, input_test_case=input_test_case, reason="infinite loop")
+            else:
+                record_failure(current_test_name, formatted_message="Unexpected status from subprocess. Contact your professor.", input_test_case=input_test_case, reason="unexpected status")
+        else:
+            record_failure(current_test_name, formatted_message="Subprocess finished without returning any data. Contact your professor.", input_test_case=input_test_case, reason="unexpected status")
 
-        if p.is_alive():
-            # Subprocess is still running; terminate it
-            p.terminate()
-            p.join()  # Ensure the main program waits for the subprocess to fully terminate
+def run_student_code(inputs, input_test_case=None, module_to_test=default_module_to_test,
+                     function_tests=None, class_tests=None, workdir=None, capture_variables="all", timer=None):
+    """
+    Runs one input test case on a warm worker and returns (timed_out, shared_data), without recording anything.
+    If workdir is given, the student's code runs in that directory instead of the current one.
+    Either way, movies.db in that directory is isolated according to database_isolation.
+    If a PhaseTimer is given, how long each phase took is added to it (see PHASE TIMINGS).
+
+    test_01 through test_08 run the same handful of input test cases over and over, so runs without
+    function/class tests are cached for the session. The cache key includes the student's source and
+    the database state before the run, and a cache hit puts the database back the way the original
+    run left it, so tests that inspect movies.db afterwards see the same thing.
+    """
+    if capture_variables not in capture_variables_modes:
+        raise ValueError(f"capture_variables must be one of {capture_variables_modes}, not {capture_variables!r}")
+    if database_isolation not in database_isolation_modes:
+        raise ValueError(f"database_isolation must be one of {database_isolation_modes}, not {database_isolation!r}")
+
+    timer = timer or PhaseTimer()
+    cacheable = execution_cache_enabled and not function_tests and not class_tests
+    database_path = os.path.abspath(os.path.join(workdir or os.getcwd(), expected_database_name))
+
+    if cacheable:
+        with timer.phase('cache_lookup'):
+            key = _execution_cache_key(inputs, input_test_case, module_to_test, database_path, capture_variables)
+            cached = _EXECUTION_CACHE.get(key)
+        if cached is not None:
+            with timer.phase('cache_restore'):
+                _restore_database_snapshot(database_path, cached['database'])
+                return cached['timed_out'], copy.deepcopy(cached['shared_data'])
+
+    with timer.phase('database_setup'):
+        isolation = effective_database_isolation()
+        case_workdir = workdir
+        if isolation == "tempdir" and workdir is None:
+            case_workdir = tempfile.mkdtemp(prefix="student_case_")
+            _restore_database_snapshot(os.path.join(case_workdir, expected_database_name), _read_database_snapshot(database_path))
+        memory_database = isolation == "memory"
+        initial_database = _read_database_snapshot(database_path) if memory_database else None
+
+    task = (None, inputs, input_test_case, module_to_test, function_tests, class_tests, None, case_workdir, capture_variables,
+            memory_database, initial_database)
+    try:
+        timed_out, shared_data = get_worker_pool().run(task, default_timeout_seconds, timer)
+
+        # put the database the case ended with where the tests look for it
+        with timer.phase('database_publish'):
+            if case_workdir != workdir:
+                _restore_database_snapshot(database_path, _read_database_snapshot(os.path.join(case_workdir, expected_database_name)))
+            elif memory_database and shared_data and 'database' in shared_data:
+                # (a case that timed out or crashed never sends its database back, so movies.db stays as it was)
+                _restore_database_snapshot(database_path, shared_data.pop('database'))
+    finally:
+        if case_workdir != workdir:
+            shutil.rmtree(case_workdir, ignore_errors=True)
+
+    if cacheable:
+        with timer.phase('cache_store'):
+            _EXECUTION_CACHE[key] = {
+                'timed_out': timed_out,
+                'shared_data': copy.deepcopy(shared_data),
+                'database': _read_database_snapshot(database_path),
+            }
+    return timed_out, shared_data
+
+def load_student_code_in_parallel(current_test_name, input_test_cases, module_to_test=default_module_to_test,
+                                  capture_variables="all"):
+    """
+    Runs all of the input test cases at once (up to worker_pool_size at a time), each in its own
+    temporary working directory so each case gets its own movies.db instead of sharing one.
 
-            # Handle timeout
-            timeout_message = timeout_message_for_students(input_test_case, current_test_name)
-            record_failure(current_test_name, formatted_message=timeout_message, input_test_case=input_test_case, reason="timeout error")
+    Yields one payload per input test case, in the same order as input_test_cases. Just like
+    load_student_code, a case that failed to run yields None, and its failure is recorded right
+    when it is yielded, so failures land in the PartialCreditRecorder in case order no matter
+    which case finished first.
+    """
+    def run_isolated(input_test_case, timer):
+        workdir = tempfile.mkdtemp(prefix="student_case_")
+        try:
+            return run_student_code(input_test_case["inputs"], input_test_case, module_to_test, workdir=workdir,
+                                    capture_variables=capture_variables, timer=timer)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    timers = [PhaseTimer() for _ in input_test_cases]
+    max_workers = max(1, min(worker_pool_size, len(input_test_cases)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_isolated, input_test_case, timer)
+                   for input_test_case, timer in zip(input_test_cases, timers)]
+        concurrent.futures.wait(futures)
+
+    for input_test_case, future, timer in zip(input_test_cases, futures, timers):
+        try:
+            timed_out, shared_data = future.result()
+            with timer.phase('report'):
+                payload = report_student_code_result(timed_out, shared_data, current_test_name, input_test_case)
+        except Exception as e:
+            exception_message_for_students(e, input_test_case, current_test_name)
+            payload = None
+        record_phase_timings(current_test_name, input_test_case, timer)
+        yield payload
 
+# ==========================
+# SESSION EXECUTION CACHE
+# ==========================
+
+# (source hash, inputs, database fingerprint, capture mode) -> {'timed_out', 'shared_data', 'database'}
+_EXECUTION_CACHE = {}
+
+def _hash_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def database_fingerprint(database_path=expected_database_name):
+    """
+    Hash of the logical contents (schema + rows) of a SQLite database, or '' if it doesn't exist
+    or has nothing in it. The raw file bytes can't be used because SQLite rewrites header counters
+    and free pages even when the data ends up the same (e.g., after clear_database).
+    """
+    if not os.path.exists(database_path):
+        return ''
+    try:
+        conn = sqlite3.connect(database_path)
+        try:
+            dump = '\n'.join(conn.iterdump())
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return _hash_file(database_path) or ''
+    if dump in ('', 'BEGIN TRANSACTION;\nCOMMIT;'):
+        return ''
+    return hashlib.sha256(dump.encode('utf-8')).hexdigest()
+
+def _execution_cache_key(inputs, input_test_case, module_to_test, database_path, capture_variables="all"):
+    case_inputs = (input_test_case or {}).get('inputs') if isinstance(input_test_case, dict) else None
+    return (
+        _hash_file(module_to_test + '.py'),
+        tuple(inputs),
+        tuple(case_inputs) if case_inputs is not None else None,
+        database_fingerprint(database_path),
+        capture_variables,
+    )
+
+def _read_database_snapshot(database_path):
+    try:
+        with open(database_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _restore_database_snapshot(database_path, snapshot):
+    if snapshot is None:
+        if os.path.exists(database_path):
+            os.remove(database_path)
+        return
+    tmp = database_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(snapshot)
+    os.replace(tmp, database_path)
+
+# ==========================
+# GRADE CACHE
+# ==========================
+
+# Failures that depend on the machine the tests ran on (timeouts, workers that crashed), or whose messages
+# quote line numbers from the student's file (which the normalized AST doesn't keep). Tests with any of
+# these are never saved, so they always run again.
+_GRADE_CACHE_UNSTABLE_REASONS = ("timeout error", "unexpected status", "student exception", "exception", "infinite loop")
+
+def normalized_source_hash(path):
+    """
+    Hash of a Python file that ignores comments, blank lines and formatting: its AST without line
+    and column numbers. Falls back to the text itself if it doesn't parse, or None if it can't be read.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            source = f.read()
+    except OSError:
+        return None
+    try:
+        normalized = ast.dump(ast.parse(source), include_attributes=False)
+    except (SyntaxError, ValueError):
+        normalized = source
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def local_import_paths(path):
+    """
+    The .py files next to the student's file that it imports, directly or through each other (e.g., a
+    helper module with the Movie class in it), so changing one of them counts as changing the student's code.
+    A local package counts with every .py file in it.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    found = set()
+    pending = [path]
+    while pending:
+        try:
+            with open(pending.pop(), 'r', encoding='utf-8', errors='replace') as f:
+                tree = ast.parse(f.read())
+        except (OSError, SyntaxError, ValueError):
+            continue
+        names = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names += [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                # "from . import helper" and "from helper import name" (the names might be modules too)
+                names += [node.module] if node.module else [alias.name for alias in node.names]
+        for name in names:
+            top_level = name.split('.')[0]
+            module_path = os.path.join(folder, top_level + '.py')
+            package_path = os.path.join(folder, top_level)
+            if os.path.isfile(module_path) and module_path not in found:
+                found.add(module_path)
+                pending.append(module_path)
+            elif os.path.isfile(os.path.join(package_path, '__init__.py')):
+                for root, _, files in os.walk(package_path):
+                    found.update(os.path.join(root, file) for file in files if file.endswith('.py'))
+    found.discard(os.path.abspath(path))
+    return sorted(found)
+
+def grades_exact_source(item):
+    """Whether the test item's file set grade_cache_exact_source = True (see GLOBAL VARIABLES)."""
+    return bool(getattr(getattr(item, 'module', None), 'grade_cache_exact_source', False))
+
+@functools.lru_cache(maxsize=None)
+def _harness_fingerprint():
+    """Hash of everything a test's result depends on besides the student's file."""
+    test_cases_dir = os.path.join(CURRENT_DIR, 'test_cases')
+    # .env (and the environment) decide which file is graded
+    paths = [os.path.join(CURRENT_DIR, 'conftest.py'), os.path.join(CURRENT_DIR, '.env')]
+    paths += sorted(os.path.join(CURRENT_DIR, name) for name in os.listdir(CURRENT_DIR)
+                    if name.startswith('test_') and name.endswith('.py'))
+    paths += sorted(os.path.join(test_cases_dir, name) for name in os.listdir(test_cases_dir)
+                    if name.endswith(('.py', '.json')))
+
+    digest = hashlib.sha256(f"python {sys.version_info[0]}.{sys.version_info[1]}".encode('utf-8'))
+    digest.update(f"\n{default_module_to_test} {default_module_to_test_2}".encode('utf-8'))
+    for path in paths:
+        digest.update(f"\n{os.path.basename(path)} {_hash_file(path)}".encode('utf-8'))
+    return digest.hexdigest()
+
+def grade_cache_key(test_name, module_to_test=default_module_to_test, exact_source=False):
+    """
+    The key a test's result is saved under: the test's name, the student's file and the local modules it imports
+    (their normalized ASTs, or their exact text if exact_source) and _harness_fingerprint.
+    None if the student's file is missing.
+    """
+    path = module_to_test + '.py'
+    file_hash = _hash_file if exact_source else normalized_source_hash
+    student_hash = file_hash(path)
+    if student_hash is None:
+        return None
+    imports = ''.join(f"\n{os.path.relpath(import_path, os.path.dirname(os.path.abspath(path)))} {file_hash(import_path)}"
+                      for import_path in local_import_paths(path))
+    return hashlib.sha256(f"{test_name}\n{student_hash}{imports}\n{_harness_fingerprint()}".encode('utf-8')).hexdigest()
+
+def read_grade_cache(key):
+    try:
+        with open(os.path.join(grade_cache_folder, key + '.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_grade_cache(key, rec: PartialCreditRecorder):
+    if not rec.cases or any(not c["passed"] and c["reason"] in _GRADE_CACHE_UNSTABLE_REASONS for c in rec.cases):
+        return
+    try:
+        os.makedirs(grade_cache_folder, exist_ok=True)
+        path = os.path.join(grade_cache_folder, key + '.json')
+        # written to a temporary file first, since other test runs (e.g., grade_submissions.py) may share the folder
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"test_id": rec.test_id, "max_score": rec.max_score, "cases": rec.cases}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+# ==========================
+# BOUNDED OUTPUT CAPTURE
+# ==========================
+
+class ExcessiveOutput(BaseException):
+    """
+    Raised by BoundedOutput once the student's code has printed more than it is allowed to. It is a
+    BaseException (like KeyboardInterrupt), so the student's `except Exception:` blocks don't catch it.
+    """
+
+class BoundedOutput(StringIO):
+    """
+    What sys.stdout is while the student's code runs. It keeps everything printed, like a StringIO,
+    until more than max_bytes have been printed. Then it keeps only the first and last window_chars
+    characters (head and tail) and the number of lines printed, and raises ExcessiveOutput from that
+    print() (and from every print() after it, in case the student's code catches it anyway).
+
+    What was printed since the last take_recent() call is also kept on its own, for LoopDetector.
+    """
+    def __init__(self, max_bytes, window_chars):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.window_chars = window_chars
+        self.byte_count = 0
+        self.line_count = 0
+        self.head = self.tail = None
+        self.recent = []
+
+    def take_recent(self):
+        """Everything printed since the last call (or since the start), as one string."""
+        recent = ''.join(self.recent)
+        self.recent.clear()
+        return recent
+
+    @property
+    def exceeded(self):
+        return self.head is not None
+
+    def write(self, s):
+        if self.exceeded:
+            raise ExcessiveOutput()
+        if not isinstance(s, str):
+            return super().write(s)  # raises the usual TypeError
+        self.byte_count += len(s) if s.isascii() else len(s.encode('utf-8', 'surrogatepass'))
+        self.line_count += s.count('\n')
+        if self.byte_count > self.max_bytes:
+            printed = self.getvalue()
+            self.head = (printed[:self.window_chars] if len(printed) >= self.window_chars
+                         else (printed + s)[:self.window_chars])
+            self.tail = (printed[-self.window_chars:] + s)[-self.window_chars:]
+            # let go of everything else that was printed
+            self.seek(0)
+            self.truncate()
+            self.recent.clear()
+            raise ExcessiveOutput()
+        self.recent.append(s)
+        return super().write(s)
+
+# ==========================
+# LOOP DETECTION
+# ==========================
+
+class InfiniteLoopDetected(BaseException):
+    """Raised by LoopDetector. A BaseException for the same reason as ExcessiveOutput."""
+
+class LoopDetector:
+    """
+    Notices the student's code going around the same loop without using up any input. Every input()
+    call is a sample of where the program is: the prompt, the line input() was called from, and
+    everything printed since the input() call before it. Once the same sample has come up `repeats`
+    times since an input was last used up, InfiniteLoopDetected is raised from that call (and from
+    every call after it, in case the student's code catches it anyway).
+
+    Only input() calls are sampled, so no amount of printing (e.g., listing thousands of movies) can
+    look like a loop. A loop that never calls input() is stopped by max_output_bytes instead.
+    """
+    def __init__(self, repeats):
+        self.repeats = repeats
+        self.state_counts = {}
+        self.detected = None  # (prompt, filename, line number) once a loop is found
+
+    def input_used(self):
+        self.state_counts.clear()
+
+    def input_called(self, prompt, printed, frame):
+        if self.detected:
+            raise InfiniteLoopDetected()
+        key = (prompt, hash(printed), frame.f_code, frame.f_lineno)
+        count = self.state_counts[key] = self.state_counts.get(key, 0) + 1
+        if count >= self.repeats:
+            self.detected = (prompt, os.path.basename(frame.f_code.co_filename), frame.f_lineno)
+            raise InfiniteLoopDetected()
+
+# ==========================
+# DATABASE ISOLATION
+# ==========================
+
+# "memory" needs sqlite3.Connection.serialize/deserialize, which were added in Python 3.11
+memory_database_supported = hasattr(sqlite3.Connection, "serialize")
+_MEMORY_FALLBACK_WARNED = []
+
+def effective_database_isolation():
+    """
+    database_isolation, except that "memory" falls back to "tempdir" where sqlite3 can't serialize a
+    database (Python < 3.11). The first time that happens, a warning says so.
+    """
+    if database_isolation == "memory" and not memory_database_supported:
+        if not _MEMORY_FALLBACK_WARNED:
+            _MEMORY_FALLBACK_WARNED.append(True)
+            warnings.warn('database_isolation = "memory" needs Python 3.11+, so "tempdir" is used instead.', RuntimeWarning)
+        return "tempdir"
+    return database_isolation
+
+class InMemoryDatabase:
+    """
+    Used by workers when database_isolation is "memory". While it is open, any sqlite3.connect() call
+    for database_path (which is what peewee's SqliteDatabase('movies.db') does under the hood) gets a
+    connection to a shared-cache in-memory database instead, loaded with initial_database first.
+    close() puts sqlite3.connect back and returns the bytes of the database the way a movies.db file
+    would have ended up. If the code never went through the redirect (e.g., peewee picked up pysqlite3,
+    or the code opened the database some other way), whatever is in the movies.db file on disk is returned
+    instead (None if there is none), so the database the code actually wrote is never thrown away.
+    """
+    _opened = 0
+
+    def __init__(self, database_path, initial_database=None):
+        InMemoryDatabase._opened += 1
+        self.database_path = database_path
+        self.uri = f"file:student_database_{os.getpid()}_{InMemoryDatabase._opened}?mode=memory&cache=shared"
+        self.redirected = False
+        self._connect = sqlite3.connect
+        # the in-memory database only lives as long as some connection to it is open
+        self._keeper = self._connect(self.uri, uri=True)
+        if initial_database:
+            source = self._connect(":memory:")
+            source.deserialize(initial_database)
+            source.backup(self._keeper)
+            source.close()
+        sqlite3.connect = self.connect
+
+    def connect(self, database, *args, **kwargs):
+        if isinstance(database, (str, os.PathLike)) and os.path.abspath(database) == self.database_path:
+            self.redirected = True
+            kwargs['uri'] = True
+            return self._connect(self.uri, *args, **kwargs)
+        return self._connect(database, *args, **kwargs)
+
+    def close(self):
+        sqlite3.connect = self._connect
+        if self.redirected:
+            try:
+                snapshot = self._keeper.serialize()
+            except sqlite3.OperationalError:
+                # nothing was ever written, which on disk is an empty file
+                snapshot = b''
         else:
-            # Subprocess finished; get the result
-            if 'status' in shared_data:
-                status = shared_data['status']
-                if status == 'success':
-                    return shared_data['payload']
-                elif status == 'exception':
-                    exception_data = shared_data['payload']  # Exception data dictionary
-                    exception_message_for_students(exception_data, input_test_case, current_test_name)
-                else:
-                    record_failure(current_test_name, formatted_message="Unexpected status from subprocess. Contact your professor.", input_test_case=input_test_case, reason="unexpected status")
-            else:
-                record_failure(current_test_name, formatted_message="Subprocess finished without returning any data. Contact your professor.", input_test_case=input_test_case, reason="unexpected status") 
-    except Exception as e:
-        exception_message_for_students(e, input_test_case, current_test_name)
+            snapshot = _read_database_snapshot(self.database_path)
+        self._keeper.close()
+        return snapshot
 
-def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_test_case, module_to_test, function_tests, class_tests, pre_imports = None):
+def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_test_case, module_to_test, function_tests, class_tests, pre_imports = None,
+                                  workdir = None, capture_variables = "all", memory_database = False, initial_database = None):
     """
     Executes the student's code in a subprocess, capturing inputs, outputs, exceptions, and testing functions/classes.
+    If workdir is given, the student's code runs with that as its working directory (so relative paths like
+    movies.db land there), while the student's files are still read from the original location.
+    capture_variables controls how locals are captured into all_variables (see capture_variables_modes).
+    If memory_database is True, movies.db is an in-memory database that starts out as initial_database
+    (the bytes of a database file, or None if there is none), and what it ends up as is put in shared_data['database'].
+    How long each phase took is put in shared_data['timings'] (see PHASE TIMINGS).
     """
     # Define a custom exception for exit handling
     class ExitCalled(Exception):
         pass
 
+    setup_start = time.perf_counter()
+    timer = PhaseTimer()
+    shared_data['timings'] = timer.phases
+    tracer = None
+    in_memory_database = None
     try:
         # Prepare the mocked input function and capture variables
         manager_payload = {}
         captured_input_prompts = []
         input_iter = iter(inputs)
+        loop_detector = LoopDetector(loop_detection_repeats) if loop_detection_repeats else None
 
         def mock_input(prompt=''):
+            if loop_detector is not None:
+                loop_detector.input_called(prompt, captured_stdout.take_recent(), sys._getframe(1))
             if prompt == '':
                 return ''
             elif normalize_text(prompt) == normalize_text("Press enter to continue..."):
@@ -613,7 +1584,10 @@ def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_
             else:
                 captured_input_prompts.append(prompt)
             try:
-                return next(input_iter)
+                next_input = next(input_iter)
+                if loop_detector is not None:
+                    loop_detector.input_used()
+                return next_input
             except StopIteration:
                 # Handle the case where there are more input() calls than provided inputs
                 raise
@@ -642,7 +1616,13 @@ def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_
         raised_exceptions = []       
         exception_handlers = get_exception_handlers_from_source(code)
 
-        student_root = os.path.abspath(os.path.dirname(module_file_path))
+        # paths are resolved against the directory the case was launched from, even after a chdir to workdir
+        launch_dir = os.getcwd()
+
+        def _resolve(path):
+            return os.path.normpath(os.path.join(launch_dir, path))
+
+        student_root = _resolve(os.path.dirname(module_file_path))
 
         # where Python lives
         stdlib_dir = os.path.abspath(sysconfig.get_paths()["stdlib"])
@@ -652,39 +1632,70 @@ def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_
         blocked_prefixes = {stdlib_dir, *site_dirs}
 
         def _is_blocked(path):
-            ap = os.path.abspath(path)
+            ap = _resolve(path)
             return any(ap.startswith(p + os.sep) or ap == p for p in blocked_prefixes)
 
         def _is_student(path):
-            ap = os.path.abspath(path)
+            ap = _resolve(path)
             return ap.startswith(student_root + os.sep) or ap == student_root
 
         inner_trace = create_trace_function(raised_exceptions, exception_handlers, scoped_locals,
-                                            student_filename=os.path.abspath(module_file_path))
+                                            student_filename=_resolve(module_file_path), base_dir=launch_dir,
+                                            capture_variables=capture_variables, timer=timer)
+
+        # co_filename -> whether frames from that file get traced. The gate runs for every new frame,
+        # so each filename is only resolved and checked against blocked_prefixes once per run.
+        gate_decisions = {}
 
         def gate(frame, event, arg):
             fn = frame.f_code.co_filename
-            if _is_blocked(fn):
-                return None                # don’t trace stdlib/site-packages
-            if _is_student(fn):
-                return inner_trace(frame, event, arg)  # trace all student files in their folder
-            return None                    # ignore everything else
+            traced = gate_decisions.get(fn)
+            if traced is None:
+                # don’t trace stdlib/site-packages, trace all student files in their folder, ignore everything else
+                traced = gate_decisions[fn] = (not _is_blocked(fn)) and _is_student(fn)
+            if traced:
+                return inner_trace(frame, event, arg)
+            return None
+
+        # Compile first so the tracing backend knows exactly which code objects are the student's
+        code_obj = compile(code, module_file_path, "exec")
+        tracer = create_trace_backend(inner_trace, gate, code_obj)
 
-        sys.settrace(gate)
+        # like running the file directly, its own folder comes first on sys.path, so it imports its own helper
+        # modules rather than same-named ones elsewhere (the worker's sys.path is put back after every case)
+        sys.path.insert(0, student_root)
+
+        if workdir:
+            os.chdir(workdir)
+
+        if memory_database:
+            in_memory_database = InMemoryDatabase(os.path.abspath(expected_database_name), initial_database)
+
+        timer.add('setup', time.perf_counter() - setup_start)
+        tracer.start()
 
         # Redirect sys.stdout to capture print statements
         old_stdout = sys.stdout
-        sys.stdout = StringIO()
+        sys.stdout = captured_stdout = BoundedOutput(max_output_bytes, excessive_output_window_chars)
 
         # Execute the student's code within the controlled namespace
         try:
-            code_obj = compile(code, module_file_path, "exec")
-            exec(code_obj, globals_dict)
+            with timer.phase('exec'):
+                exec(code_obj, globals_dict)
         except ExitCalled as e:
             print(f"Exit call intercepted: {e}")  # Log or handle exit calls
+        finally:
+            # serialize_object ran during exec, but is counted as its own phase
+            timer.add('exec', -timer.phases.get('serialize_object', 0.0))
 
         # Remove the trace function
-        sys.settrace(None)
+        stop_tracing(tracer)
+
+        # the student's code caught ExcessiveOutput or InfiniteLoopDetected (with a bare except:) and kept going
+        if captured_stdout.exceeded:
+            raise ExcessiveOutput()
+        if loop_detector is not None and loop_detector.detected:
+            raise InfiniteLoopDetected()
 
         # Capture the output printed by the student's code
         captured_output = sys.stdout.getvalue()
@@ -694,36 +1705,42 @@ def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_
 
         # Test functions if provided
         if function_tests:
-            function_results = test_functions(function_tests, globals_dict)
+            with timer.phase('function_tests'):
+                function_results = test_functions(function_tests, globals_dict)
         else:
             function_results = {"No functions tested": "No functions tested"}
 
         # Test classes if provided
         if class_tests:
-            class_results = test_classes(class_tests, globals_dict)
+            with timer.phase('class_tests'):
+                class_results = test_classes(class_tests, globals_dict)
         else:
             class_results = {"No classes tested": "No classes tested"}
 
         # ---- Build a single map of ALL variables (filtered & sanitized) ----
+        # (skipped entirely when the test doesn't use all_variables)
+        if capture_variables == "none":
+            all_variables = {}
+        else:
+            # 0) Student module name (exec ran as __main__)
+            student_module_name = "__main__"
 
-        # 0) Student module name (exec ran as __main__)
-        student_module_name = "__main__"
-
-        # 1) Start from globals from the exec namespace, excluding builtins
-        raw_globals = {k: v for k, v in globals_dict.items() if k != "__builtins__"}
+            # 1) Start from globals from the exec namespace, excluding builtins
+            raw_globals = {k: v for k, v in globals_dict.items() if k != "__builtins__"}
 
-        # 2) Merge in traced locals (these are what your tracer recorded during execution)
-        merged = {**raw_globals, **dict(scoped_locals)}
+            # 2) Merge in traced locals (these are what your tracer recorded during execution)
+            merged = {**raw_globals, **dict(scoped_locals)}
 
-        # 3) Filter and sanitize
-        filtered = {
-            name: _clean_value(val)
-            for name, val in merged.items()
-            if _keep_symbol(name, val, student_module_name)
-        }
+            # 3) Filter and sanitize
+            with timer.phase('clean_variables'):
+                filtered = {
+                    name: _clean_value(val)
+                    for name, val in merged.items()
+                    if _keep_symbol(name, val, student_module_name)
+                }
 
-        # 4) Save
-        all_variables = filtered
+            # 4) Save
+            all_variables = filtered
 
 
         # add each payload into a dictionary:
@@ -739,7 +1756,7 @@ def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_
         shared_data['payload'] = manager_payload
 
     except StopIteration as e:
-        sys.settrace(None)
+        stop_tracing(tracer)
         # Send the exception back as a dictionary
         exc_type, exc_value, exc_tb = sys.exc_info()
         input_with_quotes = [f'{index}: "{input}"' for index, input in enumerate(input_test_case["inputs"], start=1)]
@@ -759,8 +1776,30 @@ def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_
         shared_data['status'] = 'exception'
         shared_data['payload'] = exception_data
 
+    except ExcessiveOutput:
+        stop_tracing(tracer)
+        # sent back as its own status, so it is reported as an "excessive output" failure
+        shared_data['status'] = 'excessive_output'
+        shared_data['payload'] = {
+            'byte_count': captured_stdout.byte_count,
+            'line_count': captured_stdout.line_count,
+            'head': captured_stdout.head,
+            'tail': captured_stdout.tail,
+        }
+
+    except InfiniteLoopDetected:
+        stop_tracing(tracer)
+        prompt, filename, line_number = loop_detector.detected
+        shared_data['status'] = 'infinite_loop'
+        shared_data['payload'] = {
+            'prompt': prompt, 'filename': filename, 'line_number': line_number,
+            'repeats': loop_detector.repeats,
+            # whether all the inputs had been used up
+            'inputs_exhausted': next(input_iter, StopIteration) is StopIteration,
+        }
+
     except EOFError as e:
-        sys.settrace(None)
+        stop_tracing(tracer)
         # Send the exception back as a dictionary
         exc_type, exc_value, exc_tb = sys.exc_info()
         exception_data = {
@@ -773,7 +1812,7 @@ def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_
         shared_data['payload'] = exception_data
 
     except Exception as e:
-        sys.settrace(None)
+        stop_tracing(tracer)
         # Send the exception back as a dictionary
 
         exc_type, exc_value, exc_tb = sys.exc_info()
@@ -788,9 +1827,19 @@ def _load_student_code_subprocess(shared_data, current_test_name, inputs, input_
 
 
     finally:
-        sys.settrace(None)
+        stop_tracing(tracer)
         if 'old_stdout' in globals() or 'old_stdout' in locals():
             sys.stdout = old_stdout
+        if in_memory_database is not None:
+            with timer.phase('database_close'):
+                shared_data['database'] = in_memory_database.close()
+
+# Types whose instances always pickle, whatever their value (only exact types: a subclass could add
+# instance variables that don't pickle).
+_PICKLABLE_TYPES = frozenset({bool, int, float, complex, str, bytes, bytearray, type(None), date, datetime, timedelta})
+# Types found to have no pickling support at all (e.g., generators, files, database connections), so
+# none of their instances pickle. Weak, so classes from the student's code don't outlive their run.
+_UNPICKLABLE_TYPES = weakref.WeakSet()
 
 def is_picklable(obj):
     """
@@ -798,11 +1847,26 @@ def is_picklable(obj):
     Sent back to the main process through a Queue. Because that requires
     pickling the data, this is used to check if something I'm trying to send
     is actually able to be pickled before I actually send it.
+
+    Types in _PICKLABLE_TYPES and _UNPICKLABLE_TYPES are answered without pickling. Anything else
+    (containers, objects with state) is pickled, since whether it pickles depends on what it holds.
     """
+    obj_type = type(obj)
+    if obj_type in _PICKLABLE_TYPES:
+        return True
+    if obj_type in _UNPICKLABLE_TYPES:
+        return False
 
     try:
         pickle.dumps(obj)
-    except Exception:
+    except Exception as e:
+        # "cannot pickle 'X' object" about obj's own type (not something inside it) means the type can't be pickled
+        type_names = (obj_type.__qualname__, f"{obj_type.__module__}.{obj_type.__qualname__}")
+        if isinstance(e, TypeError) and str(e) in (f"cannot pickle '{name}' object" for name in type_names):
+            try:
+                _UNPICKLABLE_TYPES.add(obj_type)
+            except TypeError:
+                pass  # types that can't be weakly referenced just aren't remembered
         return False
     else:
         return True
@@ -821,41 +1885,86 @@ def _good_var_name(name: str) -> bool:
     return name.isidentifier()
 
 def create_trace_function(raised_exceptions, exception_handlers, scoped_locals,
-                          *, student_filename: str):
+                          *, student_filename: str, base_dir: str = None, capture_variables: str = "all",
+                          timer=None):
     """
     Collect locals from student frames only (by filename) and track exceptions.
     Locals are flattened as 'outer.inner.var' but only when names are clean.
+    Relative filenames are resolved against base_dir (defaults to the current working directory).
+    capture_variables picks how many snapshots of each local are kept (see capture_variables_modes).
+    If a PhaseTimer is given, the time spent capturing locals is added to its serialize_object phase.
     """
+    base_dir = base_dir or os.getcwd()
     pending_exception = {'type': None, 'frame': None}
     call_stack = []  # only for frames from the student's file
+    handlers_by_line = index_exception_handlers_by_line(exception_handlers)
+
+    student_path = os.path.normpath(os.path.join(base_dir, student_filename))
+    # co_filename -> whether it is the student's file, so each filename is only resolved once per run
+    student_file_decisions = {}
+    # fq_key -> recent snapshots ("last" mode) or the last snapshot recorded ("changed" mode)
+    recent_snapshots = {}
+    # fq_keys whose scoped_locals entry is a list built here (and so is safe to extend in place)
+    accumulated = set()
+    # serialize_object's memo for this run, so snapshots of locals that haven't changed share their results
+    serialize_memo = {}
 
     def _in_student_file(frame) -> bool:
+        filename = frame.f_code.co_filename
+        decision = student_file_decisions.get(filename)
+        if decision is not None:
+            return decision
         try:
-            fn = os.path.abspath(frame.f_code.co_filename)
+            fn = os.path.normpath(os.path.join(base_dir, filename))
             # accept compiled-from-string as a fallback (optional)
-            if fn == "<string>":
-                return True
-            return fn == os.path.abspath(student_filename)
+            decision = (fn == "<string>") or (fn == student_path)
         except Exception:
-            return False
+            decision = False
+        student_file_decisions[filename] = decision
+        return decision
 
 
     def _add_scoped_locals(frame):
-        if not _in_student_file(frame):
+        if capture_variables == "none" or not _in_student_file(frame):
             return
+        start = time.perf_counter()
         prefix = ".".join(call_stack)
         for k, v in frame.f_locals.items():
             if k == "__builtins__" or not _good_var_name(k):
                 continue
             fq_key = f"{prefix}.{k}" if prefix else k
-            serialized = serialize_object(v)
+            serialized = serialize_object(v, memo=serialize_memo)
+
+            if capture_variables == "last":
+                # keep a window of the latest snapshots; a single snapshot is stored as-is, like in "all" mode
+                window = recent_snapshots.get(fq_key)
+                if window is None:
+                    window = recent_snapshots[fq_key] = collections.deque(maxlen=captured_snapshots_per_variable)
+                window.append(serialized)
+                scoped_locals[fq_key] = window[0] if len(window) == 1 else list(window)
+                continue
+
+            if capture_variables == "changed":
+                if fq_key in recent_snapshots and (recent_snapshots[fq_key] is serialized
+                                                   or recent_snapshots[fq_key] == serialized):
+                    continue
+                recent_snapshots[fq_key] = serialized
+
             # accumulate if same var name appears multiple times
             if fq_key in scoped_locals:
                 prev = scoped_locals[fq_key]
-                scoped_locals[fq_key] = prev + [serialized] if isinstance(prev, list) else [prev, serialized]
+                if fq_key in accumulated:
+                    # extend in place; building a new list every time is quadratic for functions called in a loop
+                    prev.append(serialized)
+                else:
+                    scoped_locals[fq_key] = prev + [serialized] if isinstance(prev, list) else [prev, serialized]
+                    accumulated.add(fq_key)
             else:
                 scoped_locals[fq_key] = serialized
 
+        if timer is not None:
+            timer.add('serialize_object', time.perf_counter() - start)
+
     def trace_function(frame, event, arg):
         nonlocal pending_exception, call_stack
 
@@ -885,26 +1994,167 @@ def create_trace_function(raised_exceptions, exception_handlers, scoped_locals,
         elif event == 'line':
             # Only attempt to mark handled_by inside the student's file
             if pending_exception['type'] and _in_student_file(frame):
-                lineno = frame.f_lineno
-                for handler in exception_handlers:
-                    if handler['start_lineno'] <= lineno <= handler['end_lineno']:
-                        # Only claim a handler if it actually matches the pending exception
-                        pen = pending_exception['type']
-                        if handler.get('is_general') or (pen in handler.get('types', [])):
-                            if raised_exceptions:
-                                # record the handler type that caught it (e.g., "KeyError" or "(ValueError, KeyError)" or "Exception")
-                                raised_exceptions[-1]['handled_by'] = handler['type']
-                            pending_exception['type'] = None
-                            pending_exception['frame'] = None
-                            break
+                # only the handlers whose lines include this one, in the same order as exception_handlers
+                for handler in handlers_by_line.get(frame.f_lineno, ()):
+                    # Only claim a handler if it actually matches the pending exception
+                    pen = pending_exception['type']
+                    if handler.get('is_general') or (pen in handler.get('types', [])):
+                        if raised_exceptions:
+                            # record the handler type that caught it (e.g., "KeyError" or "(ValueError, KeyError)" or "Exception")
+                            raised_exceptions[-1]['handled_by'] = handler['type']
+                        pending_exception['type'] = None
+                        pending_exception['frame'] = None
+                        break
             return trace_function
 
         return trace_function
 
+    # lets a backend skip line events entirely while no exception is waiting for a handler
+    trace_function.has_pending_exception = lambda: pending_exception['type'] is not None
+
     return trace_function
 
 
 
+def _iter_code_objects(code):
+    """Yields a code object and every code object nested in it (functions, classes, comprehensions)."""
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from _iter_code_objects(const)
+
+
+class SetTraceBackend:
+    """
+    Traces the student's code with sys.settrace. gate is called for every new frame
+    and decides which ones get the trace function.
+    """
+
+    def __init__(self, gate):
+        self.gate = gate
+
+    def start(self):
+        sys.settrace(self.gate)
+
+    def stop(self):
+        sys.settrace(None)
+
+
+class MonitoringBackend:
+    """
+    Traces the student's code with sys.monitoring (PEP 669, Python 3.12+).
+
+    sys.settrace calls a Python function for every call, line and return anywhere in the program,
+    which made menu loops several times slower. Here events are only turned on for the code objects
+    compiled from the student's file, and LINE events switch themselves off until an exception is
+    pending (they are only needed to find the except block that handles it).
+
+    Each event is translated into the sys.settrace event it stands for (the same mapping CPython
+    itself uses for sys.settrace on 3.12+) and passed to the same trace_function, so
+    raised_exceptions, handled_by and scoped_locals come out the same as with SetTraceBackend.
+    """
+
+    # sys.monitoring leaves tool ids 3 and 4 unassigned
+    TOOL_IDS = (3, 4)
+    TOOL_NAME = "student code tracer"
+
+    def __init__(self, trace_function, code_obj):
+        self.trace_function = trace_function
+        self.code_objects = set(_iter_code_objects(code_obj))
+        self.tool_id = None
+
+    @classmethod
+    def free_tool_id(cls):
+        monitoring = getattr(sys, "monitoring", None)
+        if monitoring is None:
+            return None
+        for tool_id in cls.TOOL_IDS:
+            if monitoring.get_tool(tool_id) is None:
+                return tool_id
+        return None
+
+    def start(self):
+        monitoring = sys.monitoring
+        events = monitoring.events
+        tool_id = self.free_tool_id()
+        if tool_id is None:
+            raise RuntimeError("No free sys.monitoring tool id to trace the student's code with.")
+        monitoring.use_tool_id(tool_id, self.TOOL_NAME)
+        self.tool_id = tool_id
+
+        trace = self.trace_function
+        student_code = self.code_objects
+        DISABLE = monitoring.DISABLE
+
+        # sys._getframe(1) inside a callback is the frame of the code that triggered the event
+        def on_call(code, offset, *args):
+            if code in student_code:
+                trace(sys._getframe(1), 'call', None)
+
+        def on_return(code, offset, retval):
+            if code in student_code:
+                trace(sys._getframe(1), 'return', retval)
+
+        def on_exception(code, offset, exc):
+            if code in student_code:
+                trace(sys._getframe(1), 'exception', (type(exc), exc, exc.__traceback__))
+                # turn LINE events back on so the handler that catches this can be found
+                monitoring.restart_events()
+
+        def on_line(code, line_number):
+            if not trace.has_pending_exception():
+                return DISABLE
+            trace(sys._getframe(1), 'line', None)
+
+        self._callbacks = {
+            events.PY_START: on_call,
+            events.PY_RESUME: on_call,
+            events.PY_THROW: on_call,
+            events.PY_RETURN: on_return,
+            events.PY_YIELD: on_return,
+            events.PY_UNWIND: on_return,
+            events.RAISE: on_exception,
+            events.STOP_ITERATION: on_exception,
+            events.LINE: on_line,
+        }
+        for event, callback in self._callbacks.items():
+            monitoring.register_callback(tool_id, event, callback)
+
+        # RAISE, PY_UNWIND and PY_THROW can only be turned on globally; the callbacks filter them by code object
+        monitoring.set_events(tool_id, events.RAISE | events.PY_UNWIND | events.PY_THROW)
+        local_events = (events.PY_START | events.PY_RESUME | events.PY_RETURN | events.PY_YIELD
+                        | events.STOP_ITERATION | events.LINE)
+        for code in student_code:
+            monitoring.set_local_events(tool_id, code, local_events)
+
+    def stop(self):
+        if self.tool_id is None:
+            return
+        monitoring = sys.monitoring
+        monitoring.set_events(self.tool_id, 0)
+        for code in self.code_objects:
+            monitoring.set_local_events(self.tool_id, code, 0)
+        for event in self._callbacks:
+            monitoring.register_callback(self.tool_id, event, None)
+        monitoring.free_tool_id(self.tool_id)
+        self.tool_id = None
+
+
+def create_trace_backend(trace_function, gate, code_obj):
+    """
+    Picks the tracing backend according to the trace_backend setting at the top of this file.
+    Falls back to sys.settrace if sys.monitoring isn't available (Python < 3.12) or has no free tool id.
+    """
+    if trace_backend in ("auto", "monitoring") and MonitoringBackend.free_tool_id() is not None:
+        return MonitoringBackend(trace_function, code_obj)
+    return SetTraceBackend(gate)
+
+def stop_tracing(tracer):
+    sys.settrace(None)
+    if tracer is not None:
+        tracer.stop()
+
+
 def get_exception_handlers_from_source(source):
     exception_handlers = []
     tree = ast.parse(source)
@@ -964,6 +2214,19 @@ def get_exception_handlers_from_source(source):
     return exception_handlers
 
 
+def index_exception_handlers_by_line(exception_handlers):
+    """
+    Maps every line number covered by an except block to the handlers covering it (kept in the
+    order of exception_handlers), so the trace function can find the handler for a line in one
+    dictionary lookup instead of scanning every handler on every line event.
+    """
+    handlers_by_line = {}
+    for handler in exception_handlers:
+        for lineno in range(handler['start_lineno'], handler['end_lineno'] + 1):
+            handlers_by_line.setdefault(lineno, []).append(handler)
+    return handlers_by_line
+
+
 def exception_profiler(frame, event, arg):
     """Profile function to track exceptions raised."""
     if event == 'exception':
@@ -1426,9 +2689,30 @@ def process_init_args(init_args, all_custom_classes):
     return processed_args
 
 
-def serialize_object(obj, *, _seen=None, _depth=0, _max_depth=10):
+# exact types serialize_object returns as they are (checked before recursing, which is most of the cost on large objects)
+_SERIALIZED_AS_IS = frozenset({int, float, str, bool, type(None), date, datetime, timedelta})
+
+def _memoized_result(memo, key, obj_type, parts):
+    """
+    The result memo has under key (id and depth) if it was built for the same type from the same parts,
+    compared by identity. Children that haven't changed serialize to the same result object, so this
+    is the case when nothing inside the object has changed. The entries hold on to their parts (not to
+    the objects), so a match is right even if the id now belongs to another object with the same contents.
+    """
+    entry = memo.get(key)
+    if (entry is not None and entry[0] is obj_type and len(entry[1]) == len(parts)
+            and all(map(operator.is_, entry[1], parts))):
+        return entry[2]
+    return None
+
+def serialize_object(obj, *, _seen=None, _depth=0, _max_depth=10, memo=None):
     """Serialize arbitrarily nested objects to JSON-friendly structures,
     avoiding cycles and skipping non-data runtime objects.
+
+    memo is a dict kept between calls (e.g., for one run of the student's code). With it,
+    a container or object that hasn't changed since it was last serialized gets back the
+    very same result instead of a copy, so repeated snapshots of the same objects share
+    every part that didn't change (see _memoized_result).
     """
     if _seen is None:
         _seen = set()
@@ -1449,12 +2733,34 @@ def serialize_object(obj, *, _seen=None, _depth=0, _max_depth=10):
     # Containers
     if isinstance(obj, dict):
         _seen.add(oid)
-        return {str(k): serialize_object(v, _seen=_seen, _depth=_depth+1, _max_depth=_max_depth)
-                for k, v in obj.items()}
+        if memo is None:
+            return {str(k): serialize_object(v, _seen=_seen, _depth=_depth+1, _max_depth=_max_depth)
+                    for k, v in obj.items()}
+        # keys and serialized values, alternating
+        parts = []
+        for k, v in obj.items():
+            parts.append(k)
+            parts.append(v if type(v) in _SERIALIZED_AS_IS
+                         else serialize_object(v, _seen=_seen, _depth=_depth+1, _max_depth=_max_depth, memo=memo))
+        key = (oid, _depth)
+        result = _memoized_result(memo, key, type(obj), parts)
+        if result is None:
+            result = {str(parts[i]): parts[i + 1] for i in range(0, len(parts), 2)}
+            memo[key] = (type(obj), parts, result)
+        return result
     if isinstance(obj, (list, tuple, set)):
         _seen.add(oid)
-        seq = [serialize_object(v, _seen=_seen, _depth=_depth+1, _max_depth=_max_depth) for v in obj]
-        return seq if isinstance(obj, list) else tuple(seq) if isinstance(obj, tuple) else set(seq)
+        if memo is None:
+            seq = [serialize_object(v, _seen=_seen, _depth=_depth+1, _max_depth=_max_depth) for v in obj]
+            return seq if isinstance(obj, list) else tuple(seq) if isinstance(obj, tuple) else set(seq)
+        seq = [v if type(v) in _SERIALIZED_AS_IS
+               else serialize_object(v, _seen=_seen, _depth=_depth+1, _max_depth=_max_depth, memo=memo) for v in obj]
+        key = (oid, _depth)
+        result = _memoized_result(memo, key, type(obj), seq)
+        if result is None:
+            result = list(seq) if isinstance(obj, list) else tuple(seq) if isinstance(obj, tuple) else set(seq)
+            memo[key] = (type(obj), seq, result)
+        return result
 
     # Skip/short-circuit noisy runtime objects that cause deep graphs
     if isinstance(obj, (types.ModuleType,
@@ -1471,10 +2777,17 @@ def serialize_object(obj, *, _seen=None, _depth=0, _max_depth=10):
             data = vars(obj)
         except Exception:
             return repr(obj)
-        return {
-            "__class__": obj.__class__.__name__,
-            "__data__": serialize_object(data, _seen=_seen, _depth=_depth+1, _max_depth=_max_depth),
-        }
+        parts = (obj.__class__, serialize_object(data, _seen=_seen, _depth=_depth+1, _max_depth=_max_depth, memo=memo))
+        key = (oid, _depth)
+        result = _memoized_result(memo, key, type(obj), parts) if memo is not None else None
+        if result is None:
+            result = {
+                "__class__": obj.__class__.__name__,
+                "__data__": parts[1],
+            }
+            if memo is not None:
+                memo[key] = (type(obj), parts, result)
+        return result
 
     # Fallback
     return repr(obj)
@@ -1802,10 +3115,103 @@ def timeout_message_for_students(input_test_case, current_test_name):
                     current_test_name=current_test_name,
                     )
 
+def excessive_output_message_for_students(output_data, input_test_case, current_test_name):
+    """
+    Message for a case that was stopped because the student's code printed more than max_output_bytes.
+    output_data is what BoundedOutput kept: byte_count, line_count, head and tail.
+    """
+    test_case_inputs = (input_test_case or {}).get("inputs", [])
+    test_case_inputs = '\n'.join(f'{index}: "{input}"' for index, input in enumerate(test_case_inputs, start=1))
+    case_id = (input_test_case or {}).get('id_input_test_case')
+
+    return format_error_message(
+                custom_message=(f"ExcessiveOutput\n\n"
+                                f"### How to fix it:\n"
+                                f"--------------\n"
+                                f"Your code printed more than {max_output_bytes / (1024 * 1024):.0f} MB of output "
+                                f"({output_data['line_count']:,} lines) during Input Test Case {case_id}, so the test stopped it early. "
+                                f"This is almost always a loop that keeps printing without ever stopping (for example, a menu that is shown over and over). "
+                                f"To find it, run your code like normal, but enter these EXACT inputs in this order (without the quotes):\n"
+                                f"```\n{test_case_inputs}\n```\n"
+                                f"### The start of what your code printed:\n"
+                                f"```\n{output_data['head']}\n```\n"
+                                f"### The end of what your code printed:\n"
+                                f"```\n{output_data['tail']}\n```\n"),
+                input_test_case=input_test_case,
+                current_test_name=current_test_name,
+                )
+
+def infinite_loop_message_for_students(loop_data, input_test_case, current_test_name):
+    """
+    Message for a case that LoopDetector stopped. loop_data has the prompt of the input() call that
+    kept repeating, where it was called from, and whether the inputs had run out.
+    """
+    test_case_inputs = (input_test_case or {}).get("inputs", [])
+    test_case_inputs = '\n'.join(f'{index}: "{input}"' for index, input in enumerate(test_case_inputs, start=1))
+    case_id = (input_test_case or {}).get('id_input_test_case')
+    location = f"line {loop_data['line_number']} of {loop_data['filename']}"
+
+    what_happened = (f"Your code kept calling input() on {location} with the prompt "
+                     f"\"{loop_data['prompt'].strip()}\", over and over ({loop_data['repeats']:,} times) without anything changing. ")
+    if loop_data['inputs_exhausted']:
+        what_happened += (f"All of the inputs from the test case had already been entered, so your code is asking for more input() "
+                          f"calls than the test case expected. Because it kept going, your code most likely has a try/except "
+                          f"around input() that catches every kind of error and loops back to ask again. ")
+
+    return format_error_message(
+                custom_message=(f"InfiniteLoop\n\n"
+                                f"### How to fix it:\n"
+                                f"--------------\n"
+                                f"The test stopped Input Test Case {case_id} early because your code got stuck in an infinite loop. "
+                                f"{what_happened}"
+                                f"To see it happen, run your code like normal, and enter these EXACT inputs in this order (without the quotes):\n"
+                                f"```\n{test_case_inputs}\n```\n"
+                                f"Your code should end after all of those inputs have been entered.\n\n"),
+                input_test_case=input_test_case,
+                current_test_name=current_test_name,
+                )
+
 # =========================
 # ASSORTED HELPER FUNCTIONS
 # =========================
 
+# Precompiled pieces of normalize_text (see _normalize_string)
+_PERIOD_NOT_BETWEEN_DIGITS = re.compile(r'(?<!\d)\.(?!\d)')
+_COLON_BEFORE_NON_SPACE = re.compile(r'(:)(\S)')
+_REMOVED_SYMBOLS = str.maketrans('', '', '!"#$%&\'()*+,/:;<=>?@[]^_`{|}~')
+# every hyphen except a negative sign (one at the start or after a space, followed by a digit)
+_NON_NEGATIVE_HYPHEN = re.compile(r'(?<!^)(?<!\s)-|-(?!\d)')
+
+@functools.lru_cache(maxsize=8192)
+def _normalize_string(text):
+    """
+    normalize_text for a single string. The same menu lines and prompts get normalized over and over,
+    so results are memoized.
+    """
+    # Lowercase the input, and reduce all whitespace (including newlines) to a single space
+    # (stripping the ends this early doesn't change anything below: the start of the text and a space
+    # are treated the same everywhere)
+    text = ' '.join(text.lower().split())
+
+    # Remove periods not between digits
+    if '.' in text:
+        text = _PERIOD_NOT_BETWEEN_DIGITS.sub('', text)
+
+    # If there is any character followed by a colon : other than a space, add a space
+    if ':' in text:
+        text = _COLON_BEFORE_NON_SPACE.sub(r'\1 \2', text)
+
+    # Remove all other punctuation and symbols
+    text = text.translate(_REMOVED_SYMBOLS)
+
+    # Replace hyphens (e.g., between numbers) with a space, but keep negative signs
+    if '-' in text:
+        text = _NON_NEGATIVE_HYPHEN.sub(' ', text)
+
+    # Replace multiple spaces again in case punctuation removal created extra spaces,
+    # and strip leading and trailing spaces
+    return ' '.join(text.split())
+
 def normalize_text(text):
     """
     Used by tests that look for specific output or input prompts.
@@ -1815,38 +3221,7 @@ def normalize_text(text):
     """
     
     if isinstance(text, str):
-        # Lowercase the input
-        text = text.lower()
-        
-        # Replace newlines with a single space
-        text = text.replace('\n', ' ')
-        
-        # Replace multiple spaces with a single space
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove periods not between digits
-        text = re.sub(r'(?<!\d)\.(?!\d)', '', text)
-        
-        # If there is any character followed by a colon : other than a space, add a space
-        text = re.sub(r'(:)(\S)', r'\1 \2', text)
-    
-        # Remove all other punctuation and symbols
-        text = re.sub(r'[!"#$%&\'()*+,/:;<=>?@\[\]^_`{|}~]', '', text)
-        
-        # Temporarily replace negative signs with a placeholder
-        text = re.sub(r'((?<=^)|(?<=\s))-(?=\d)', 'NEG_SIGN_PLACEHOLDER', text)
-        
-        # Replace remaining hyphens (e.g., between numbers) with a space
-        text = text.replace('-', ' ')
-        
-        # Replace multiple spaces again in case punctuation removal created extra spaces
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Restore negative signs
-        text = text.replace('NEG_SIGN_PLACEHOLDER', '-')
-        
-        # Strip leading and trailing spaces
-        return text.strip()
+        return _normalize_string(text)
     
     elif isinstance(text, dict):
         # Apply normalize_text to both keys and values in the dictionary
@@ -1869,35 +3244,32 @@ def insert_newline_at_last_space(s, width=74):
     """
 
     lines = []
-    current_line = ""
-    
-    for char in s:
-        current_line += char
-        
-        # If we hit a newline, append the current line and reset the line
-        if char == '\n':
-            lines.append(current_line.strip())  # Add the line and strip any extra spaces
-            current_line = ""
-            continue
-        
-        # If the current line exceeds the width, break at the last space
-        if len(current_line) > width:
+    segments = s.split('\n')
+
+    for segment_number, segment in enumerate(segments):
+        # start is where the line currently being built begins within this segment
+        start = 0
+
+        # A line is too long once it holds more than width characters
+        while len(segment) - start > width:
             # Find the last space before the width limit
-            break_index = current_line.rfind(' ', 0, width)
-            
+            break_index = segment.rfind(' ', start, start + width)
+
             # If no space is found, break at the width limit
             if break_index == -1:
-                break_index = width
-            
+                break_index = start + width
+
             # Append the part of the line before the break
-            lines.append(current_line[:break_index].strip())
-            
-            # Reset current_line to the remaining unprocessed part of the string
-            current_line = current_line[break_index:].lstrip()  # Remove leading spaces in the next line
-            
-    # Append the last part of the string (if any)
-    if current_line:
-        lines.append(current_line.strip())
+            lines.append(segment[start:break_index].strip())
+
+            # The next line starts after the break, minus any leading whitespace
+            # (only up to the character that made this line too long)
+            remainder = segment[break_index:start + width + 1]
+            start = start + width + 1 - len(remainder.lstrip())
+
+        # Every line that ended with a newline is kept (even if empty), the last one only if anything is left
+        if segment_number < len(segments) - 1 or start < len(segment):
+            lines.append(segment[start:].strip())
     
     return '\n'.join(lines)
 
@@ -1973,7 +3345,12 @@ def get_similarity_feedback(normalized_expected_phrase, normalized_captured_stri
     similar_strings = []
     
     for captured_string in normalized_captured_strings_list:
-        similarity = difflib.SequenceMatcher(None, normalized_expected_phrase, captured_string).ratio()
+        matcher = difflib.SequenceMatcher(None, normalized_expected_phrase, captured_string)
+        # real_quick_ratio (lengths only) and quick_ratio (character counts) are upper bounds on ratio(),
+        # so most captured strings can be ruled out without running the full comparison.
+        if matcher.real_quick_ratio() < similarity_threshold or matcher.quick_ratio() < similarity_threshold:
+            continue
+        similarity = matcher.ratio()
         
         if similarity >= similarity_threshold:
             # 1) Materialize the iterator into a list
@@ -2044,6 +3421,140 @@ def normalize_dataframe(df):
     df = df.map(normalize_text)
     return df
 
+# ================
+# PHRASE MATCHING
+# ================
+
+# stands in for "<wildcard>" while a phrase is normalized (normalize_text would strip the < and >)
+_WILDCARD_PLACEHOLDER = '\x00'
+
+class PhraseMatcher:
+    """
+    Checks a list of expected (or invalid) phrases against the normalized output of one input test case
+    in a single pass, instead of calling re.search once per phrase.
+
+    Each phrase is normalized with normalize_text (and numbers rounded with round_match if round_numbers),
+    and then used as a regular expression, just like the tests always did. "<wildcard>" in a phrase
+    matches any text in between. matcher.phrases holds the normalized phrases (for failure messages), and
+    matcher.search(text) returns, for each phrase, whether re.search would have found it in text.
+    """
+
+    def __init__(self, phrases, round_numbers=False):
+        self.phrases = []
+        self.patterns = []
+        for phrase in phrases:
+            phrase = normalize_text(phrase.replace("<wildcard>", _WILDCARD_PLACEHOLDER))
+            if round_numbers:
+                phrase = re.sub(r'\d+(?:\.\d+)?', round_match, phrase)
+            pattern = phrase.replace(_WILDCARD_PLACEHOLDER, r".+?")
+            re.compile(pattern)  # a broken pattern raises here, like it did in re.search
+            self.phrases.append(phrase.replace(_WILDCARD_PLACEHOLDER, "<wildcard>"))
+            self.patterns.append(pattern)
+
+        # the same pattern often shows up more than once (e.g., the menu), so each one is only looked for once
+        self._unique_patterns = list(dict.fromkeys(self.patterns))
+
+    def search(self, text):
+        found = self._find_patterns(text)
+        return [pattern in found for pattern in self.patterns]
+
+    def _find_patterns(self, text):
+        # Backslashes could be group references, which would point to other phrases once they are all
+        # combined into one pattern, so phrases with one are searched for on their own.
+        found = {pattern for pattern in self._unique_patterns if '\\' in pattern and re.search(pattern, text)}
+        remaining = [pattern for pattern in self._unique_patterns if '\\' not in pattern]
+
+        # One scan with every remaining phrase as an alternative finds all phrases that don't overlap.
+        # A phrase can be missed when a match of another phrase covers where it starts, so scan again with
+        # only the phrases that haven't been found yet, until a scan finds nothing new.
+        while remaining:
+            combined = re.compile('|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(remaining)))
+            hits = set()
+            for match in combined.finditer(text):
+                hits.add(int(match.lastgroup[1:]))
+                if len(hits) == len(remaining):
+                    break
+            if not hits:
+                break
+            found.update(remaining[i] for i in hits)
+            remaining = [pattern for i, pattern in enumerate(remaining) if i not in hits]
+        return found
+
+# ==========================
+# DATABASE TABLE COMPARISON
+# ==========================
+# Lightweight stand-ins for pd.read_sql, normalize_dataframe, df_error_message_formatting and
+# pd.testing.assert_frame_equal, so the database tests don't need to import (or install) pandas
+# just to compare a table with two or three rows. A table is a dict of column name -> list of values.
+
+def read_table(conn, table_name):
+    """
+    Reads every row of table_name into a table ({column: [values]}, in column order).
+    Raises sqlite3.Error if the table doesn't exist, just like pd.read_sql.
+    """
+    cursor = conn.execute(f"select * from {table_name};")
+    columns = [description[0] for description in cursor.description]
+    rows = cursor.fetchall()
+    return {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+
+def normalize_table(table):
+    """Same as normalize_dataframe: normalizes the column names and every value."""
+    return {normalize_text(column): [normalize_text(value) for value in values] for column, values in table.items()}
+
+def _is_null(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _table_column_type(values):
+    """The name df_error_message_formatting would show for the dtype pandas gives this column."""
+    non_null = [value for value in values if not _is_null(value)]
+    if values and all(isinstance(value, bool) for value in values):
+        return 'bool'
+    if non_null and all(_is_number(value) for value in non_null):
+        if len(non_null) == len(values) and all(isinstance(value, int) for value in values):
+            return 'int'
+        # pandas turns a numeric column with any floats or missing values into float64 (None -> nan)
+        return 'float'
+    return 'str'
+
+def table_error_message_formatting(table):
+    """Same output as df_error_message_formatting, for a table from read_table."""
+    rows = []
+    for column, values in table.items():
+        column_type = _table_column_type(values)
+        if column_type == 'float':
+            values = [float('nan') if _is_null(value) else float(value) for value in values]
+        elif any(isinstance(value, str) for value in values) and all(isinstance(value, str) or _is_null(value) for value in values):
+            # pandas' str dtype shows missing values as nan too
+            values = [float('nan') if _is_null(value) else value for value in values]
+        rows.append(f"{column} ({column_type}): {values}")
+    return "\n".join(rows)
+
+def assert_tables_equal(actual, expected, atol=.2, rtol=1e-5):
+    """
+    Checks two tables the same way assert_frame_equal(check_column_type=False, check_dtype=False) does:
+    same columns in the same order, same number of rows, numbers within atol/rtol of each other,
+    missing values (None/nan) only where the other table has one too, and everything else exactly equal.
+    Raises an AssertionError describing the first difference.
+    """
+    if list(actual) != list(expected):
+        raise AssertionError(f"Table columns are different: {list(actual)} != {list(expected)}")
+    for column, expected_values in expected.items():
+        actual_values = actual[column]
+        if len(actual_values) != len(expected_values):
+            raise AssertionError(f"Table shapes are different: {len(actual_values)} rows != {len(expected_values)} rows")
+        for row, (left, right) in enumerate(zip(actual_values, expected_values)):
+            if _is_null(left) or _is_null(right):
+                equal = _is_null(left) and _is_null(right)
+            elif _is_number(left) and _is_number(right):
+                equal = math.isclose(left, right, rel_tol=rtol, abs_tol=atol)
+            else:
+                equal = left == right
+            if not equal:
+                raise AssertionError(f'Column "{column}" is different at row {row}: {left!r} != {right!r}')
+
 def clear_database(table_name):
     try:
         assert sqlite_db_exists(expected_database_name)
@@ -2062,6 +3573,33 @@ def clear_database(table_name):
         print(f"Error clearing the database: {e}")
         return False
 
+# template name -> in-memory database built from it (see database_templates.py)
+_DATABASE_TEMPLATES = {}
+
+def restore_database_template(template_name, database_path=expected_database_name):
+    """
+    Replaces everything in the database at database_path with one of the templates in database_templates.py,
+    using the sqlite3 backup API (each template is only built once per session).
+    """
+    source = _DATABASE_TEMPLATES.get(template_name)
+    if source is None:
+        template = database_templates_dict[template_name]
+        rows = template['rows']
+        source = sqlite3.connect(":memory:", check_same_thread=False)
+        source.execute(template['create_table_sql'])
+        source.executemany(
+            f"INSERT INTO {template['table_name']} ({', '.join(rows)}) VALUES ({', '.join('?' * len(rows))})",
+            zip(*rows.values()),
+        )
+        source.commit()
+        _DATABASE_TEMPLATES[template_name] = source
+
+    destination = sqlite3.connect(database_path)
+    try:
+        source.backup(destination)
+    finally:
+        destination.close()
+
 def check_forbidden_statements(code, forbidden_types):
     """
     Parses the given code and checks if any of the forbidden statement types are used.
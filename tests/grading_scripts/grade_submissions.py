@@ -0,0 +1,302 @@
+'''
+DESCRIPTION:
+
+Grades a whole folder of student submissions locally (for regrades and late-policy
+reruns), instead of one repository per push like the GitHub workflow does.
+
+submissions_folder can hold either:
+- one .py file per student, named after the student (e.g., jdoe.py), or
+- one folder per student, named after the student, with the student's a12_movie_tracker.py in it
+  (and any helper modules it imports, which are copied along with it).
+
+The submissions are graded in parallel by grader_count grader processes. Each grader
+runs the tests (with pytest.main) for one submission after another in the same process,
+so pytest, peewee and the harness's forkserver (with its warm workers) stay loaded
+between submissions. Each grader has its own working directory: the submission is copied in as
+student_file_name (with the rest of the student's folder, for a folder submission), and the tests
+write their reports there, just like in a student's repository.
+
+If grading a submission takes longer than submission_timeout_seconds, its grader is
+killed (along with everything it started) and replaced, and the submission gets 0 points.
+That way one submission that hangs can't hold up the rest.
+
+The graders turn on the grade cache (see GRADE CACHE in conftest.py) and share one in
+output_folder/.grade_cache, so grading the folder again (e.g., after a few late submissions come in)
+only runs the tests on submissions whose code changed. Set the GRADE_CACHE environment variable to 0
+to grade everything again.
+
+Output, in output_folder:
+- scores.csv: one row per student, with the same columns as tests/test_scores.csv (test_id holds
+  the student's name, and the cases and points are the totals over every test).
+- <student>/test_scores.csv, <student>/TEST_RESULTS_SUMMARY.md and <student>/pytest_output.txt
+  for every student that was graded.
+
+Run it from the root of the repository:
+    python tests/grading_scripts/grade_submissions.py
+'''
+import collections
+import csv
+import multiprocessing
+import multiprocessing.connection
+import os
+import shutil
+import signal
+import sys
+import time
+
+submissions_folder = r"submissions"
+output_folder = r"graded_submissions"
+# Name the tests expect the student's file to have (STUDENT_FILE in tests/.env, plus .py):
+student_file_name = "a12_movie_tracker.py"
+# Number of submissions graded at once:
+grader_count = os.cpu_count() or 1
+# Longest a single submission may take to grade before it is given 0 points:
+submission_timeout_seconds = 300
+
+tests_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+repository_folder = os.path.dirname(tests_folder)
+score_columns = ["test_id", "passed_cases", "total_cases", "points_awarded", "max_score", "points_per_case"]
+# Files the tests leave in a grader's working directory that are kept for each student:
+report_files = [os.path.join("tests", "test_scores.csv"), "TEST_RESULTS_SUMMARY.md", "pytest_output.txt"]
+
+
+def find_submissions(folder):
+    '''Returns (student, path to their file or folder) for every submission in folder, sorted by student.'''
+    submissions = []
+    for entry in sorted(os.listdir(folder)):
+        path = os.path.join(folder, entry)
+        if os.path.isfile(path) and entry.endswith(".py"):
+            submissions.append((entry[:-len(".py")], os.path.abspath(path)))
+        elif os.path.isfile(os.path.join(path, student_file_name)):
+            submissions.append((entry, os.path.abspath(path)))
+    return submissions
+
+
+def clear_folder(folder):
+    for entry in os.listdir(folder):
+        path = os.path.join(folder, entry)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+
+def ungraded_row():
+    return {"passed_cases": "", "total_cases": "", "points_awarded": 0, "max_score": "", "points_per_case": ""}
+
+
+def read_total_row(scores_csv):
+    '''Adds up the rows of a test_scores.csv into one row (test_id is filled in by the caller).'''
+    passed = total = 0
+    points = max_score = ""
+    with open(scores_csv, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["test_id"] == "TOTAL":
+                points, max_score = row["points_awarded"], row["max_score"]
+            else:
+                passed += int(row["passed_cases"])
+                total += int(row["total_cases"])
+    return {"passed_cases": passed, "total_cases": total, "points_awarded": points, "max_score": max_score,
+            "points_per_case": ""}
+
+
+def forget_test_modules():
+    '''
+    pytest imports a fresh conftest.py every session, but the test files would otherwise stay imported
+    (still using the conftest.py from the first session), so they are forgotten after every session.
+    Everything else they import (pytest, peewee, sqlite3, ...) stays loaded.
+    '''
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None) or ""
+        if os.path.dirname(os.path.abspath(module_file)) == tests_folder and (name == "conftest" or name.startswith("test_")):
+            del sys.modules[name]
+
+
+def grade_one(student, submission_path, workdir, student_output_folder):
+    '''Runs the tests on one submission inside workdir (the grader's working directory).'''
+    clear_folder(workdir)
+    if os.path.isdir(submission_path):
+        # the whole folder, so the student's own helper modules are the ones their file imports
+        # (the reports the tests write are left out, so old ones can't be read back as this run's)
+        shutil.copytree(submission_path, workdir, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(".git", "__pycache__", "tests", *map(os.path.basename, report_files)))
+        shutil.copyfile(os.path.join(submission_path, student_file_name), os.path.join(workdir, student_file_name))
+    else:
+        shutil.copyfile(submission_path, os.path.join(workdir, student_file_name))
+
+    import pytest
+
+    # pytest's own output (and anything the tests print) goes to the student's pytest_output.txt
+    saved_fds = os.dup(1), os.dup(2)
+    with open(os.path.join(workdir, "pytest_output.txt"), "w", encoding="utf-8") as log:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            # addopts is cleared because the "tests" in pytest.ini is relative to where pytest is started from
+            pytest.main([tests_folder, "-c", os.path.join(repository_folder, "pytest.ini"), "-o", "addopts=",
+                         "--rootdir", repository_folder, "-p", "no:cacheprovider", "-q", "--tb=no", "--no-header"])
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, saved_fd in zip((1, 2), saved_fds):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+            forget_test_modules()
+
+    os.makedirs(student_output_folder, exist_ok=True)
+    for report_file in report_files:
+        if os.path.exists(os.path.join(workdir, report_file)):
+            shutil.copyfile(os.path.join(workdir, report_file),
+                            os.path.join(student_output_folder, os.path.basename(report_file)))
+
+    scores_csv = os.path.join(workdir, "tests", "test_scores.csv")
+    if not os.path.exists(scores_csv):
+        return ungraded_row()
+    return read_total_row(scores_csv)
+
+
+def grader_loop(conn, workdir):
+    '''
+    Main loop of a grader process. Receives (student, submission path, output folder) over conn,
+    grades it, and sends back its row. None tells the grader to exit.
+    '''
+    if hasattr(os, "setsid"):
+        # its own process group, so a hung grader can be killed together with its forkserver and workers
+        os.setsid()
+    os.makedirs(workdir, exist_ok=True)
+    # the grader stays in workdir for good: the forkserver and workers it starts inherit it
+    os.chdir(workdir)
+    # the graders already run in parallel, so each one runs its input test cases one at a time
+    os.environ["WORKER_POOL_SIZE"] = "1"
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        student, submission_path, student_output_folder = task
+        try:
+            row = grade_one(student, submission_path, workdir, student_output_folder)
+            status = "graded"
+        except Exception as e:
+            row = ungraded_row()
+            status = f"error: {type(e).__name__}: {e}"
+        conn.send((row, status))
+    conn.close()
+
+
+class Grader:
+    def __init__(self, context, workdir):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=grader_loop, args=(child_conn, workdir))
+        self.process.start()
+        child_conn.close()
+        self.workdir = workdir
+        self.task = None
+        self.started = None
+
+    def send(self, task):
+        self.task = task
+        self.started = time.monotonic()
+        self.conn.send(task)
+
+    def kill(self):
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass  # the grader hadn't made its process group yet
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(10)
+        if self.process.is_alive():
+            self.kill()
+
+
+def main():
+    submissions = find_submissions(submissions_folder)
+    if not submissions:
+        print(f"No submissions found in {os.path.abspath(submissions_folder)}")
+        return
+    workspace = os.path.abspath(os.path.join(output_folder, ".workspace"))
+    # the graders inherit these, so they all share one grade cache that is kept between runs
+    os.environ.setdefault("GRADE_CACHE", "1")
+    os.environ.setdefault("GRADE_CACHE_DIR", os.path.abspath(os.path.join(output_folder, ".grade_cache")))
+    context = multiprocessing.get_context("spawn")
+
+    pending = collections.deque(submissions)
+    graders = [Grader(context, os.path.join(workspace, f"grader_{number}"))
+               for number in range(min(grader_count, len(submissions)))]
+    rows, statuses = {}, {}
+    start = time.perf_counter()
+
+    def finish(grader, row, status):
+        student = grader.task[0]
+        rows[student], statuses[student] = row, status
+        grader.task = None
+        print(f"[{len(rows)}/{len(submissions)}] {student}: {row['points_awarded']}/{row['max_score']} ({status})")
+
+    while pending or any(grader.task for grader in graders):
+        for grader in graders:
+            if grader.task is None and pending:
+                student, submission_path = pending.popleft()
+                grader.send((student, submission_path, os.path.abspath(os.path.join(output_folder, student))))
+
+        busy = [grader for grader in graders if grader.task]
+        ready = multiprocessing.connection.wait([grader.conn for grader in busy], timeout=1)
+        for index, grader in enumerate(graders):
+            if grader.task is None:
+                continue
+            if grader.conn in ready:
+                try:
+                    row, status = grader.conn.recv()
+                    finish(grader, row, status)
+                    continue
+                except (EOFError, OSError):
+                    row, status = None, "error: the grader process crashed"
+            elif time.monotonic() - grader.started > submission_timeout_seconds:
+                row, status = None, f"timed out after {submission_timeout_seconds} seconds"
+            else:
+                continue
+            # the grader crashed or hung: give the submission 0 points and replace the grader
+            grader.kill()
+            finish(grader, ungraded_row(), status)
+            graders[index] = Grader(context, grader.workdir)
+
+    for grader in graders:
+        grader.stop()
+    shutil.rmtree(workspace, ignore_errors=True)
+
+    # submissions that never finished get the same max_score as everyone else
+    max_scores = [row["max_score"] for row in rows.values() if row["max_score"] != ""]
+    common_max_score = collections.Counter(max_scores).most_common(1)[0][0] if max_scores else ""
+    os.makedirs(output_folder, exist_ok=True)
+    scores_path = os.path.join(output_folder, "scores.csv")
+    with open(scores_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(score_columns)
+        for student, _ in submissions:
+            row = rows[student]
+            writer.writerow([student, row["passed_cases"], row["total_cases"], row["points_awarded"],
+                             row["max_score"] if row["max_score"] != "" else common_max_score, row["points_per_case"]])
+
+    problems = {student: status for student, status in statuses.items() if status != "graded"}
+    print(f"\nGraded {len(submissions)} submission(s) in {time.perf_counter() - start:.1f}s -> {scores_path}")
+    for student, status in problems.items():
+        print(f"  {student}: {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+# A made-up student program for test_database_isolation.py. It adds a movie to
+# movies.db, opening the database either by its file name (like peewee does) or
+# through a URI, which sqlite3.connect isn't called with when database_isolation
+# is "memory".
+import sqlite3
+
+how = input("Open movies.db by name or uri? ")
+if how == "uri":
+    connection = sqlite3.connect("file:movies.db", uri=True)
+else:
+    connection = sqlite3.connect("movies.db")
+connection.execute("create table if not exists movie (name text)")
+connection.execute("insert into movie (name) values (?)", (input("Movie name: "),))
+connection.commit()
+connection.close()
@@ -0,0 +1,5 @@
+# A made-up student program for test_student_imports.py. Like a student who splits their
+# code into modules, it imports a helper module that sits next to it.
+import movie_helpers
+
+print(movie_helpers.describe(input("Movie name: ")))
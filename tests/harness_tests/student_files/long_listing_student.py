@@ -0,0 +1,27 @@
+# A made-up student program for test_loop_detection.py. It lists thousands of movies
+# with one print() per row, either all at once or a page at a time, which is a lot of
+# identical-looking work between inputs but not a loop.
+import sqlite3
+
+connection = sqlite3.connect(":memory:")
+connection.execute("create table movie (id integer primary key, name text, year_released integer)")
+connection.executemany("insert into movie (name, year_released) values (?, ?)",
+                       [(f"Movie {number}", 1900 + number % 120) for number in range(3000)])
+
+
+def list_movies(page_size):
+    for row in connection.execute("select id, name, year_released from movie"):
+        print(row[0], row[1], row[2])
+        if page_size and row[0] % page_size == 0:
+            input("Press enter to continue...")
+
+
+while True:
+    choice = input("Choose an option (1-3): ")
+    if choice == "1":
+        list_movies(0)
+    elif choice == "2":
+        list_movies(10)
+    elif choice == "3":
+        print("Goodbye!")
+        break
@@ -0,0 +1,3 @@
+# The helper module helper_importing_student.py imports.
+def describe(name):
+    return f"{name} (from the student's own helper module)"
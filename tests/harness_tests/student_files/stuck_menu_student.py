@@ -0,0 +1,12 @@
+# A made-up student program for test_loop_detection.py. Its menu catches every error
+# around input(), so once the inputs run out it keeps asking forever.
+while True:
+    try:
+        choice = input("Choose an option (1-2): ")
+    except Exception:
+        print("Something went wrong, try again.")
+        continue
+    if choice == "1":
+        print("Hello!")
+    elif choice == "2":
+        break
@@ -0,0 +1,9 @@
+# A made-up student program for test_database_templates.py. It only reads movies.db,
+# printing the name of every movie rated 4 or above (option 4 in the assignment), so it
+# needs a database that already has rated movies in it.
+import sqlite3
+
+connection = sqlite3.connect("movies.db")
+for (name,) in connection.execute("select name from movie where rating >= 4 order by id"):
+    print(name)
+connection.close()
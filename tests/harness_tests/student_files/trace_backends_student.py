@@ -0,0 +1,67 @@
+# A made-up student program for test_trace_backends.py. It raises and handles
+# exceptions in a few different ways and has locals in functions, methods,
+# generators and comprehensions, so both tracing backends have something to record.
+
+
+class Shelf:
+    def __init__(self, name):
+        self.name = name
+        self.items = []
+
+    def add(self, item):
+        if not item:
+            raise ValueError("Empty item")
+        self.items.append(item)
+        return len(self.items)
+
+
+def parse_year(text):
+    try:
+        year = int(text)
+    except ValueError:
+        year = None
+    return year
+
+
+def checked_year(text):
+    year = parse_year(text)
+    if year is None:
+        raise TypeError(f"{text} isn't a year")
+    return year
+
+
+def countdown(start):
+    current = start
+    while current > 0:
+        yield current
+        current -= 1
+
+
+def main():
+    shelf = Shelf("Movies")
+    for title in ["Inception", "", "Up"]:
+        try:
+            count = shelf.add(title)
+        except ValueError as error:
+            message = str(error)
+            print(message)
+        else:
+            print(f"{count} item(s)")
+
+    years = []
+    for text in [input("First year: "), input("Second year: ")]:
+        try:
+            years.append(checked_year(text))
+        except (TypeError, KeyError):
+            print(f"Skipped {text}")
+
+    squares = [number * number for number in countdown(3)]
+    lookup = {"a": 1}
+    try:
+        missing = lookup["b"]
+    except LookupError:
+        missing = 0
+    print(years, squares, missing)
+
+
+main()
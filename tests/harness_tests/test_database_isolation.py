@@ -0,0 +1,50 @@
+'''
+Checks that every database_isolation mode leaves movies.db the way the student's code
+left it, including "memory" when the code opens the database in a way the redirect
+doesn't catch.
+
+These test the testing code itself, so they don't count towards the student's score.
+'''
+import os
+import sqlite3
+
+import pytest
+
+import conftest
+
+student_module = os.path.join(os.path.dirname(os.path.abspath(__file__)), "student_files", "database_student")
+
+
+def movie_names(workdir):
+    connection = sqlite3.connect(os.path.join(workdir, conftest.expected_database_name))
+    try:
+        return [name for (name,) in connection.execute("select name from movie")]
+    finally:
+        connection.close()
+
+
+isolation_modes = [
+    pytest.param(mode, marks=pytest.mark.skipif(mode == "memory" and not conftest.memory_database_supported,
+                                                reason='database_isolation = "memory" needs Python 3.11+'))
+    for mode in conftest.database_isolation_modes
+]
+
+
+@pytest.mark.parametrize("database_isolation", isolation_modes)
+@pytest.mark.parametrize("how", ["name", "uri"])
+def test_movies_db_has_what_the_code_wrote(database_isolation, how, tmp_path, monkeypatch):
+    monkeypatch.setattr(conftest, "database_isolation", database_isolation)
+    monkeypatch.setattr(conftest, "execution_cache_enabled", False)
+    connection = sqlite3.connect(os.path.join(tmp_path, conftest.expected_database_name))
+    connection.execute("create table movie (name text)")
+    connection.execute("insert into movie (name) values ('Inception')")
+    connection.commit()
+    connection.close()
+    inputs = [how, "Up"]
+
+    timed_out, shared_data = conftest.run_student_code(inputs, {"id_input_test_case": None, "inputs": inputs},
+                                                       student_module, workdir=str(tmp_path))
+
+    assert not timed_out
+    assert shared_data['status'] == 'success', shared_data
+    assert movie_names(tmp_path) == ["Inception", "Up"]
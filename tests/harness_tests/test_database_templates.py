@@ -0,0 +1,48 @@
+'''
+Checks that the database_template fixture (restore_database_template) gives the
+student's code a movies.db that holds exactly the template's table and rows, so a
+test can start from it instead of entering every movie through the menu first.
+
+These test the testing code itself, so they don't count towards the student's score.
+'''
+import os
+import sqlite3
+
+import conftest
+from database_templates import database_templates_dict # type: ignore
+
+student_module = os.path.join(os.path.dirname(os.path.abspath(__file__)), "student_files", "top_rated_student")
+
+
+def test_template_replaces_everything_in_the_database(database_template, tmp_path):
+    database_path = os.path.join(tmp_path, conftest.expected_database_name)
+    connection = sqlite3.connect(database_path)
+    connection.execute("create table movie (name text)")
+    connection.execute("create table leftover (name text)")
+    connection.execute("insert into movie (name) values ('Up')")
+    connection.commit()
+    connection.close()
+
+    database_template("two_movies_both_watched", database_path)
+
+    connection = sqlite3.connect(database_path)
+    try:
+        tables = [name for (name,) in connection.execute("select name from sqlite_master where type = 'table'")]
+        movies = conftest.read_table(connection, "movie")
+    finally:
+        connection.close()
+    assert tables == ["movie"]
+    assert movies == database_templates_dict["two_movies_both_watched"]["rows"]
+
+
+def test_student_code_starts_from_the_template(database_template, tmp_path, monkeypatch):
+    monkeypatch.setattr(conftest, "execution_cache_enabled", False)
+    database_template("two_movies_both_watched", os.path.join(tmp_path, conftest.expected_database_name))
+
+    timed_out, shared_data = conftest.run_student_code([], {"id_input_test_case": None, "inputs": []},
+                                                       student_module, workdir=str(tmp_path))
+
+    assert not timed_out
+    assert shared_data['status'] == 'success', shared_data
+    # Inception is rated 2, Pride & Prejudice 5
+    assert shared_data['payload']['captured_output'].splitlines() == ["Pride & Prejudice"]
@@ -0,0 +1,63 @@
+'''
+Checks that grade_cache_key changes whenever the student's code changes, including the
+local modules the student's file imports, but not for edits that only touch comments
+(unless the test's file sets grade_cache_exact_source, like test_10_sufficient_comments.py).
+
+These test the testing code itself, so they don't count towards the student's score.
+'''
+import os
+import types
+
+import conftest
+import test_10_sufficient_comments
+
+test_name = "test_03_creating_single_movie"
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def test_key_follows_local_imports(tmp_path):
+    student = os.path.join(tmp_path, "student")
+    write(f"{student}.py", "import helper\nfrom movies import models\nimport peewee\nhelper.main()\n")
+    write(os.path.join(tmp_path, "helper.py"), "from shared import greet\n\ndef main():\n    greet()\n")
+    write(os.path.join(tmp_path, "shared.py"), "def greet():\n    print('Hi')\n")
+    os.makedirs(os.path.join(tmp_path, "movies"))
+    write(os.path.join(tmp_path, "movies", "__init__.py"), "")
+    write(os.path.join(tmp_path, "movies", "models.py"), "RATINGS = range(1, 6)\n")
+    write(os.path.join(tmp_path, "unrelated.py"), "print('not imported')\n")
+
+    assert [os.path.relpath(path, tmp_path) for path in conftest.local_import_paths(f"{student}.py")] == [
+        "helper.py", os.path.join("movies", "__init__.py"), os.path.join("movies", "models.py"), "shared.py"]
+
+    key = conftest.grade_cache_key(test_name, student)
+    write(os.path.join(tmp_path, "unrelated.py"), "print('still not imported')\n")
+    write(os.path.join(tmp_path, "shared.py"), "# says hi\ndef greet():\n    print('Hi')  # the greeting\n")
+    assert conftest.grade_cache_key(test_name, student) == key
+
+    write(os.path.join(tmp_path, "shared.py"), "def greet():\n    print('Hello')\n")
+    assert conftest.grade_cache_key(test_name, student) != key
+    key = conftest.grade_cache_key(test_name, student)
+
+    write(os.path.join(tmp_path, "movies", "models.py"), "RATINGS = range(0, 6)\n")
+    assert conftest.grade_cache_key(test_name, student) != key
+
+
+def test_exact_source_key_follows_comments(tmp_path):
+    student = os.path.join(tmp_path, "student")
+    write(f"{student}.py", "print('Hi')\n")
+    key = conftest.grade_cache_key(test_name, student, exact_source=True)
+    write(f"{student}.py", "# says hi\nprint('Hi')\n")
+    assert conftest.grade_cache_key(test_name, student, exact_source=True) != key
+
+
+def test_tests_declare_exact_source():
+    assert conftest.grades_exact_source(types.SimpleNamespace(module=test_10_sufficient_comments))
+    assert not conftest.grades_exact_source(types.SimpleNamespace(module=conftest))
+
+
+def test_grade_cache_is_off_by_default():
+    if os.getenv("GRADE_CACHE") is None:
+        assert not conftest.grade_cache_enabled
@@ -0,0 +1,47 @@
+'''
+Checks that LoopDetector stops a menu that keeps asking for input after the inputs ran
+out, but never a program that just prints a lot between inputs.
+
+These test the testing code itself, so they don't count towards the student's score.
+'''
+import os
+
+import pytest
+
+import conftest
+
+student_files = os.path.join(os.path.dirname(os.path.abspath(__file__)), "student_files")
+
+
+def run(module, inputs, workdir):
+    return conftest.run_student_code(inputs, {"id_input_test_case": None, "inputs": inputs},
+                                     os.path.join(student_files, module), workdir=str(workdir))
+
+
+@pytest.fixture(autouse=True)
+def fewer_repeats(monkeypatch):
+    # low enough that the listings below would be stopped if they counted as loops
+    monkeypatch.setattr(conftest, "loop_detection_repeats", 50)
+    monkeypatch.setattr(conftest, "execution_cache_enabled", False)
+
+
+@pytest.mark.parametrize("choice", ["1", "2"])
+def test_long_listing_is_not_a_loop(choice, tmp_path):
+    timed_out, shared_data = run("long_listing_student", [choice, "3"], tmp_path)
+
+    assert not timed_out
+    assert shared_data['status'] == 'success', shared_data.get('payload')
+    output = shared_data['payload']['captured_output']
+    assert "3000 Movie 2999" in output
+    assert output.rstrip().endswith("Goodbye!")
+
+
+def test_stuck_menu_is_stopped(tmp_path):
+    timed_out, shared_data = run("stuck_menu_student", ["1"], tmp_path)
+
+    assert not timed_out
+    assert shared_data['status'] == 'infinite_loop'
+    loop_data = shared_data['payload']
+    assert loop_data['prompt'] == "Choose an option (1-2): "
+    assert loop_data['inputs_exhausted']
+    assert loop_data['repeats'] == 50
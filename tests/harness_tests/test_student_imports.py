@@ -0,0 +1,24 @@
+'''
+Checks that the student's code can import helper modules that sit next to its file,
+wherever the case runs (so it works the same in grade_submissions.py, where the
+student's files aren't in the root of the repository).
+
+These test the testing code itself, so they don't count towards the student's score.
+'''
+import os
+
+import conftest
+
+student_module = os.path.join(os.path.dirname(os.path.abspath(__file__)), "student_files", "helper_importing_student")
+
+
+def test_student_code_imports_its_own_helper_module(tmp_path, monkeypatch):
+    monkeypatch.setattr(conftest, "execution_cache_enabled", False)
+    inputs = ["Up"]
+
+    timed_out, shared_data = conftest.run_student_code(inputs, {"id_input_test_case": None, "inputs": inputs},
+                                                       student_module, workdir=str(tmp_path))
+
+    assert not timed_out
+    assert shared_data['status'] == 'success', shared_data
+    assert "Up (from the student's own helper module)" in shared_data['payload']['captured_output']
@@ -0,0 +1,119 @@
+'''
+Checks read_table, normalize_table, table_error_message_formatting and
+assert_tables_equal (which test_03 through test_08 use to check movies.db) against
+the pandas code they replaced: pd.read_sql, normalize_dataframe,
+df_error_message_formatting and pd.testing.assert_frame_equal. Each generated pair of
+tables has to pass or fail the same way and be formatted the same way in both.
+
+pandas is only needed for these tests (GitHub Actions installs it), so they're
+skipped without it. They test the testing code itself, so they don't count towards
+the student's score.
+'''
+import random
+import sqlite3
+
+import pytest
+
+import conftest
+
+pd = pytest.importorskip("pandas")
+
+# Number of random pairs of tables to compare:
+random_tables = 300
+# Columns the tables are made from, and the values each one can hold (like the movie table
+# in the tests, plus values that are close, differently typed, or differently formatted):
+column_values = {
+    "id": [1, 2, 3, 2.0, 2.1, 2.5, None, "2"],
+    "name": ["Inception", "inception.", "Pride & Prejudice", "Pride and Prejudice", "", None, 2010],
+    "year_released": [2010, 2006, 2010.0, 2010.15, 2010.3, -5, None, "2010"],
+    "status": ["Want to watch", "Watched", "want-to-watch", "Watched!", None],
+    "rating": [None, 1, 4, 5, 4.1, 4.5, 0.0, "5"],
+}
+
+
+def random_table(rng, min_rows=0):
+    columns = list(column_values)
+    if rng.random() < .2:
+        columns = rng.sample(columns, rng.randint(1, len(columns)))
+    rows = rng.randint(min_rows, 3)
+    return {column: [rng.choice(column_values[column]) for _ in range(rows)] for column in columns}
+
+
+def perturbed(table, rng):
+    '''A copy of table with a few values changed, a row dropped, or a column renamed.'''
+    table = {column: list(values) for column, values in table.items()}
+    change = rng.random()
+    if change < .1 and table:
+        column = rng.choice(list(table))
+        table[f"{column}s"] = table.pop(column)
+    elif change < .2:
+        for values in table.values():
+            del values[-1:]
+    else:
+        for _ in range(rng.randint(0, 2)):
+            column = rng.choice(list(table))
+            if table[column]:
+                table[column][rng.randrange(len(table[column]))] = rng.choice(column_values[column])
+    return table
+
+
+def in_database(table):
+    '''Writes table into an in-memory movie table, like the one the student's code leaves in movies.db.'''
+    db = sqlite3.connect(":memory:")
+    db.execute(f"create table movie ({', '.join(table)});")
+    rows = list(zip(*table.values()))
+    if rows:
+        db.executemany(f"insert into movie values ({', '.join('?' * len(table))});", rows)
+    return db
+
+
+def pandas_result(actual_db, expected):
+    actual_data = conftest.normalize_dataframe(pd.read_sql('select * from movie;', actual_db))
+    expected_data = conftest.normalize_dataframe(pd.DataFrame(expected))
+    try:
+        pd.testing.assert_frame_equal(actual_data, expected_data, check_column_type=False, check_dtype=False, atol=.2)
+        equal = True
+    except AssertionError:
+        equal = False
+    return (equal, conftest.df_error_message_formatting(actual_data),
+            conftest.df_error_message_formatting(expected_data))
+
+
+def table_result(actual_db, expected):
+    actual_data = conftest.normalize_table(conftest.read_table(actual_db, 'movie'))
+    expected_data = conftest.normalize_table(expected)
+    try:
+        conftest.assert_tables_equal(actual_data, expected_data, atol=.2)
+        equal = True
+    except AssertionError:
+        equal = False
+    return (equal, conftest.table_error_message_formatting(actual_data),
+            conftest.table_error_message_formatting(expected_data))
+
+
+def test_tables_compare_like_pandas():
+    rng = random.Random(10)
+    for _ in range(random_tables):
+        # (the expected tables in the tests always have rows; pandas types the columns of an empty one differently)
+        expected = random_table(rng, min_rows=1)
+        actual = perturbed(expected, rng) if rng.random() < .8 else random_table(rng)
+        db = in_database(actual)
+        try:
+            assert table_result(db, expected) == pandas_result(db, expected), (actual, expected)
+        finally:
+            db.close()
+
+
+def test_matching_tables_pass():
+    expected = {
+        "id": [1, 2],
+        "name": ["Inception", "Pride & Prejudice"],
+        "year_released": [2010, 2006],
+        "status": ["Watched", "Want to watch"],
+        "rating": [5, None],
+    }
+    db = in_database(expected)
+    try:
+        assert table_result(db, expected)[0]
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+'''
+Checks that normalize_text and insert_newline_at_last_space in conftest.py give exactly
+the same output as the versions they replaced. The originals are the copies kept in
+tests/benchmark_scripts/compare_normalize_text.py and compare_insert_newline.py, and
+the strings are the same kinds those scripts compare (every string in
+input_test_cases_final.json, plus random ones), just fewer of them so this stays fast.
+
+These test the testing code itself, so they don't count towards the student's score.
+'''
+import json
+import os
+import random
+import sys
+
+import conftest
+
+sys.path.insert(0, os.path.join(conftest.CURRENT_DIR, "benchmark_scripts"))
+
+import compare_insert_newline  # noqa: E402
+import compare_normalize_text  # noqa: E402
+
+json_file = os.path.join(conftest.CURRENT_DIR, "test_cases", "input_test_cases_final.json")
+# Number of random strings to compare with each original (the insert_newline_at_last_space ones are
+# much longer, and each one is wrapped at several widths):
+random_strings_normalize_text = 5000
+random_strings_insert_newline = 1000
+
+
+def random_strings_from(count, alphabet, max_length, seed):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+
+def input_test_case_strings():
+    with open(json_file, "r", encoding="utf-8") as file:
+        strings = []
+        compare_normalize_text.collect_strings(json.load(file), strings)
+    return strings
+
+
+def test_normalize_text_matches_original():
+    strings = input_test_case_strings() + random_strings_from(
+        random_strings_normalize_text, compare_normalize_text.random_alphabet, compare_normalize_text.random_string_max_length, seed=303)
+    for s in strings:
+        assert conftest.normalize_text(s) == compare_normalize_text.original_normalize_text(s), s
+
+
+def test_normalize_text_matches_original_on_containers():
+    value = {"Name:": ["Inception.", ("Want-to watch", -5)], "Rating": {"x": "4.5!"}}
+    assert conftest.normalize_text(value) == compare_normalize_text.original_normalize_text(value)
+
+
+def test_insert_newline_at_last_space_matches_original():
+    strings = input_test_case_strings() + random_strings_from(
+        random_strings_insert_newline, compare_insert_newline.random_alphabet, compare_insert_newline.random_string_max_length, seed=316)
+    for s in strings:
+        for width in compare_insert_newline.widths:
+            assert (conftest.insert_newline_at_last_space(s, width)
+                    == compare_insert_newline.original_insert_newline_at_last_space(s, width)), (s, width)
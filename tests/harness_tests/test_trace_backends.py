@@ -0,0 +1,45 @@
+'''
+Checks that MonitoringBackend (sys.monitoring, used on Python 3.12+ and so on GitHub
+Actions) records the same exceptions and variables as SetTraceBackend (sys.settrace)
+for a student program that raises and handles exceptions in a few different ways.
+
+These test the testing code itself, so they don't count towards the student's score.
+'''
+import json
+import os
+import re
+import sys
+
+import pytest
+
+import conftest
+
+student_module = os.path.join(os.path.dirname(os.path.abspath(__file__)), "student_files", "trace_backends_student")
+inputs = ["2010", "soon"]
+
+
+def without_addresses(all_variables):
+    '''all_variables with memory addresses (e.g., in the repr of a class's methods) masked, since those change every run.'''
+    return re.sub(r" at 0x[0-9a-fA-F]+", " at 0x...", json.dumps(all_variables, sort_keys=True, default=repr))
+
+
+def run_with_backend(backend, workdir, monkeypatch):
+    monkeypatch.setattr(conftest, "trace_backend", backend)
+    # the second run would otherwise come straight out of the cache
+    monkeypatch.setattr(conftest, "execution_cache_enabled", False)
+    timed_out, shared_data = conftest.run_student_code(inputs, {"id_input_test_case": None, "inputs": inputs},
+                                                       student_module, workdir=str(workdir))
+    assert not timed_out
+    assert shared_data['status'] == 'success', shared_data
+    return shared_data['payload']
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="sys.monitoring needs Python 3.12+")
+def test_monitoring_backend_matches_settrace(tmp_path, monkeypatch):
+    settrace = run_with_backend("settrace", tmp_path, monkeypatch)
+    monitoring = run_with_backend("monitoring", tmp_path, monkeypatch)
+
+    assert settrace['raised_exceptions'], "the student program should raise exceptions"
+    assert monitoring['raised_exceptions'] == settrace['raised_exceptions']
+    assert without_addresses(monitoring['all_variables']) == without_addresses(settrace['all_variables'])
+    assert monitoring['captured_output'] == settrace['captured_output']
@@ -2,6 +2,8 @@ max_score = 5  # This value is pulled by yml_generator.py to assign a score to t
 from conftest import (
     normalize_text,
     load_student_code,
+    load_student_code_in_parallel,
+    PhraseMatcher,
     format_error_message,
     exception_message_for_students,
     round_match,
@@ -24,16 +26,16 @@ def test_01_input_prompts(current_test_name, input_test_cases):
             exception_message_for_students(ValueError("input_test_cases should be a list of dictionaries. Contact your professor."), input_test_case=input_test_case) 
             return  # Technically not needed, as exception_message_for_students throws a pytest.fail Error, but included for clarity that this ends the test.
 
-        for input_test_case in input_test_cases:
-            clear_database('movie')
+        # Each case runs in its own working directory (and database), so they can all run at once
+        manager_payloads = load_student_code_in_parallel(current_test_name, input_test_cases, default_module_to_test,
+                                                         capture_variables="none")
+
+        for input_test_case, manager_payload in zip(input_test_cases, manager_payloads):
             case_id = input_test_case["id_input_test_case"]
             inputs = input_test_case["inputs"]
             expected_input_prompts = input_test_case["input_prompts"]
             invalid_input_prompts = input_test_case["invalid_input_prompts"]
 
-            # Load in the student's code and capture output
-            manager_payload = load_student_code(current_test_name, inputs, input_test_case, default_module_to_test)
-            
             if not manager_payload:
                 continue # if there was an error in running student code, it's already been logged. Just skip to the next test case.
 
@@ -49,11 +51,9 @@ def test_01_input_prompts(current_test_name, input_test_cases):
             case_failed_messages = []
 
             # Check that each required phrase (regex pattern) is found in the normalized captured output
-            for expected_phrase in expected_input_prompts:
-                expected_phrase = normalize_text(expected_phrase)
-                regex_pattern = expected_phrase.replace("<wildcard>", r".+?")
-                match = re.search(regex_pattern, normalized_captured_input_prompts_str)
-
+            expected_matcher = PhraseMatcher(expected_input_prompts)
+            expected_found = expected_matcher.search(normalized_captured_input_prompts_str)
+            for expected_phrase, match in zip(expected_matcher.phrases, expected_found):
                 if not match:
                     similarity_message = get_similarity_feedback(expected_phrase, normalized_captured_input_prompts_list)
 
@@ -79,11 +79,9 @@ def test_01_input_prompts(current_test_name, input_test_cases):
                     case_failed_messages.append(formatted)
 
             # Ensure none of the invalid phrases are found in the normalized captured output
-            for invalid_phrase in invalid_input_prompts:
-                invalid_phrase = normalize_text(invalid_phrase)
-                regex_pattern = invalid_phrase.replace("<wildcard>", r".+?")
-                match = re.search(regex_pattern, normalized_captured_input_prompts_str)
-
+            invalid_matcher = PhraseMatcher(invalid_input_prompts)
+            invalid_found = invalid_matcher.search(normalized_captured_input_prompts_str)
+            for invalid_phrase, match in zip(invalid_matcher.phrases, invalid_found):
                 if match:
                     formatted = format_error_message(
                         custom_message=("You used an invalid input() prompt (ignoring punctuation and capitalization):\n\n"
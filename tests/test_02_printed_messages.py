@@ -2,6 +2,8 @@ max_score = 15  # This value is pulled by yml_generator.py to assign a score to
 from conftest import (
     normalize_text,
     load_student_code,
+    load_student_code_in_parallel,
+    PhraseMatcher,
     format_error_message,
     exception_message_for_students,
     round_match,
@@ -25,8 +27,11 @@ def test_02_printed_messages(current_test_name, input_test_cases):
             exception_message_for_students(ValueError("input_test_cases should be a list of dictionaries. Contact your professor."), input_test_case, current_test_name) 
             return  # Technically not needed, as exception_message_for_students throws a pytest.fail Error, but included for clarity that this ends the test.
 
-        for input_test_case in input_test_cases:
-            clear_database('movie')
+        # Each case runs in its own working directory (and database), so they can all run at once
+        manager_payloads = load_student_code_in_parallel(current_test_name, input_test_cases, default_module_to_test,
+                                                         capture_variables="none")
+
+        for input_test_case, manager_payload in zip(input_test_cases, manager_payloads):
             # Capture the case id for reporting
             case_id = input_test_case["id_input_test_case"]
 
@@ -36,9 +41,6 @@ def test_02_printed_messages(current_test_name, input_test_cases):
             expected_printed_messages = expected_printed_messages_str.split('\n')
             invalid_printed_messages = input_test_case["invalid_printed_messages"]
 
-            # Load in the student's code and capture output
-            manager_payload = load_student_code(current_test_name, inputs, input_test_case, default_module_to_test)
-            
             if not manager_payload:
                 continue # if there was an error in running student code, it's already been logged. Just skip to the next test case.
 
@@ -59,13 +61,10 @@ def test_02_printed_messages(current_test_name, input_test_cases):
             case_failed_messages = []  # collect case's failure messages (exactly as before)
 
             # Check that each required phrase (regex pattern) is found in the normalized captured output
-            for expected_phrase in expected_printed_messages:
-                expected_phrase = normalize_text(expected_phrase)
-                expected_phrase = re.sub(r'\d+(?:\.\d+)?', round_match, expected_phrase)
-
-                # Check if the pattern exists in the normalized captured print statements
-                match = re.search(expected_phrase, normalized_captured_print_statements_str)
-
+            # (all of them are looked for in one pass over the output)
+            expected_matcher = PhraseMatcher(expected_printed_messages, round_numbers=True)
+            expected_found = expected_matcher.search(normalized_captured_print_statements_str)
+            for expected_phrase, match in zip(expected_matcher.phrases, expected_found):
                 # if there isn't a match, prepare the strings for the failure message to make it less confusing.
                 if not match:
                     similarity_message = get_similarity_feedback(expected_phrase, normalized_captured_print_statements_list)
@@ -93,12 +92,9 @@ def test_02_printed_messages(current_test_name, input_test_cases):
                     case_failed_messages.append(formatted)
 
             # Ensure none of the invalid phrases are found in the normalized captured output
-            for invalid_phrase in invalid_printed_messages:
-                invalid_phrase = normalize_text(invalid_phrase)
-
-                regex_pattern = invalid_phrase.replace("<wildcard>", r".+?")
-                match = re.search(regex_pattern, normalized_captured_print_statements_str)
-
+            invalid_matcher = PhraseMatcher(invalid_printed_messages)
+            invalid_found = invalid_matcher.search(normalized_captured_print_statements_str)
+            for invalid_phrase, match in zip(invalid_matcher.phrases, invalid_found):
                 if match:
                     formatted = format_error_message(
                         custom_message=("You used an invalid printed message (ignoring punctuation / capitalization):\n\n"
@@ -5,8 +5,10 @@ from conftest import (
     format_error_message,
     exception_message_for_students,
     round_match,
-    df_error_message_formatting,
-    normalize_dataframe,
+    read_table,
+    normalize_table,
+    table_error_message_formatting,
+    assert_tables_equal,
     get_similarity_feedback,
     sqlite_db_exists,
     clear_database,
@@ -16,7 +18,7 @@ from conftest import (
     record_failure,
     default_module_to_test
 )
-import re, subprocess, sys, sqlite3
+import re, sqlite3
 
 # Checks if the expected printed messages actually appear, but doesn't check for specific inputs or correct calculations.
 def test_05_two_movies_no_updates(current_test_name, input_test_cases):
@@ -35,7 +37,7 @@ def test_05_two_movies_no_updates(current_test_name, input_test_cases):
         clear_database('movie')
 
         # Load in the student's code and capture output
-        load_student_code(current_test_name, inputs, input_test_case, default_module_to_test)
+        load_student_code(current_test_name, inputs, input_test_case, default_module_to_test, capture_variables="none")
 
         # Ensure the expected database is here
         if not sqlite_db_exists(expected_database_name):
@@ -50,31 +52,25 @@ def test_05_two_movies_no_updates(current_test_name, input_test_cases):
             rec.fail_case(case_id=case_id, custom_message=formatted, case_type='input')
             return
 
-        try:
-            import pandas as pd
-        except ImportError:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "pandas"])
-            import pandas as pd
-
         # Expected data
-        expected_data = pd.DataFrame({
+        expected_data = {
             "id": [1, 2],
             "name": ["Inception", "Pride & Prejudice"],
             "year_released": [2010, 2006],
             "status": ["Want to watch", "Want to watch"],
             "rating": [None, None]
-        })
+        }
 
-        expected_data = normalize_dataframe(expected_data)
+        expected_data = normalize_table(expected_data)
 
-        expected_data_str = df_error_message_formatting(expected_data)
+        expected_data_str = table_error_message_formatting(expected_data)
     
         db = sqlite3.connect(expected_database_name)
 
         db_tables = db.execute("SELECT name FROM sqlite_master WHERE type='table';")
         db_tables_str = '\n'.join([row[0] for row in db_tables])
         try:
-            actual_data = pd.read_sql('select * from movie;', db)
+            actual_data = read_table(db, 'movie')
         except Exception as e:
             formatted = format_error_message(
                 custom_message=(f"Your {expected_database_name} database didn't have the expected table name:\n\n"
@@ -93,11 +89,11 @@ def test_05_two_movies_no_updates(current_test_name, input_test_cases):
             rec.fail_case(case_id=case_id, custom_message=formatted, case_type='input')
             return
 
-        actual_data = normalize_dataframe(actual_data)
-        actual_data_str = df_error_message_formatting(actual_data)
+        actual_data = normalize_table(actual_data)
+        actual_data_str = table_error_message_formatting(actual_data)
 
         try:
-            pd.testing.assert_frame_equal(actual_data, expected_data, check_column_type=False, check_dtype=False, atol=.2)
+            assert_tables_equal(actual_data, expected_data, atol=.2)
         except AssertionError as e:
             formatted = format_error_message(
                 custom_message=(f"Your {expected_database_name} database didn't contain the expected values.\n\n"
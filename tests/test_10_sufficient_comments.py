@@ -1,4 +1,5 @@
 max_score = 5 # This value is pulled by yml_generator.py to assign a score to this test.
+grade_cache_exact_source = True # This test reads the comments, so the grade cache only replays it for the exact same file.
 import re
 from conftest import (
     default_module_to_test,
@@ -0,0 +1,97 @@
+# ========================
+# DATABASE TEMPLATE CLASS
+# ========================
+
+class DatabaseTemplate:
+    """
+    A prebuilt database that a test can load into movies.db before running the student's code,
+    instead of replaying a long list of menu inputs just to get the database into that state.
+    rows is a table in the same format read_table uses: {column name: [values]}.
+    """
+    def __init__(self, template_name: str, table_name: str, create_table_sql: str, rows: dict):
+        self.template_name = template_name
+        self.table_name = table_name
+        self.create_table_sql = create_table_sql
+        self.rows = rows
+
+    def to_dict(self):
+        return {
+            "template_name": self.template_name,
+            "table_name": self.table_name,
+            "create_table_sql": self.create_table_sql,
+            "rows": self.rows,
+        }
+
+# =========================
+# DATABASE TEMPLATES
+# =========================
+
+# The same table peewee creates for the Movie model in the solution file.
+movie_table_sql = ('CREATE TABLE "movie" ("id" INTEGER NOT NULL PRIMARY KEY, "name" VARCHAR(255) NOT NULL, '
+                   '"year_released" INTEGER NOT NULL, "status" VARCHAR(255) NOT NULL, "rating" INTEGER)')
+
+# Same as after input test case 1
+one_movie = DatabaseTemplate(
+    template_name="one_movie",
+    table_name="movie",
+    create_table_sql=movie_table_sql,
+    rows={
+        "id": [1],
+        "name": ["Inception"],
+        "year_released": [2010],
+        "status": ["Want to watch"],
+        "rating": [None]
+    }
+)
+
+# Same as after input test case 3
+two_movies = DatabaseTemplate(
+    template_name="two_movies",
+    table_name="movie",
+    create_table_sql=movie_table_sql,
+    rows={
+        "id": [1, 2],
+        "name": ["Inception", "Pride & Prejudice"],
+        "year_released": [2010, 2006],
+        "status": ["Want to watch", "Want to watch"],
+        "rating": [None, None]
+    }
+)
+
+# Same as after input test case 4
+two_movies_one_watched = DatabaseTemplate(
+    template_name="two_movies_one_watched",
+    table_name="movie",
+    create_table_sql=movie_table_sql,
+    rows={
+        "id": [1, 2],
+        "name": ["Inception", "Pride & Prejudice"],
+        "year_released": [2010, 2006],
+        "status": ["Watched", "Want to watch"],
+        "rating": [5, None]
+    }
+)
+
+# Same as after input test case 5
+two_movies_both_watched = DatabaseTemplate(
+    template_name="two_movies_both_watched",
+    table_name="movie",
+    create_table_sql=movie_table_sql,
+    rows={
+        "id": [1, 2],
+        "name": ["Inception", "Pride & Prejudice"],
+        "year_released": [2010, 2006],
+        "status": ["Watched", "Watched"],
+        "rating": [2, 5]
+    }
+)
+
+# add each template to this list.
+database_templates_list = [
+    one_movie,
+    two_movies,
+    two_movies_one_watched,
+    two_movies_both_watched,
+]
+
+database_templates_dict = {template.template_name: template.to_dict() for template in database_templates_list}